@@ -0,0 +1,267 @@
+"""
+Benchmarks of profile construction and search.
+
+Build and search are timed on the bundled fixtures and on synthetic profiles and
+sequences over a grid of model lengths ``M`` and sequence lengths ``L``. Every
+case runs in a forked process of its own, so that its peak resident memory can
+be told apart from the other cases. Results are printed and, with ``--output``,
+saved as JSON. Two result files can be compared with ``--compare``::
+
+    python benchmarks/bench.py --output before.json
+    python benchmarks/bench.py --output after.json
+    python benchmarks/bench.py --compare before.json after.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from io import StringIO
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import iseq
+from hmmer_reader import open_hmmer
+from nmm import Sequence as NMMSequence
+
+AMINO = "ACDEFGHIKLMNPQRSTVWY"
+
+Case = Tuple[str, Dict[str, Any], Callable[[], Tuple[Callable[[], Any], int]]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", default="10,100", help="model lengths M")
+    parser.add_argument("--lengths", default="100,1000", help="sequence lengths L")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare(*args.compare)
+        return
+
+    models = [int(m) for m in args.models.split(",")]
+    lengths = [int(n) for n in args.lengths.split(",")]
+    results = run(fixture_cases() + grid_cases(models, lengths), args.repeat)
+
+    if args.output is not None:
+        report = {
+            "iseq": iseq.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+
+
+def run(cases: Sequence[Case], repeat: int) -> List[Dict[str, Any]]:
+    ctx = get_context("fork")
+    results: List[Dict[str, Any]] = []
+    print(f"{'case':<32} {'seconds':>10} {'ns/cell':>10} {'peak MiB':>10}")
+    for name, params, setup in cases:
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_measure, args=(setup, repeat, send))
+        proc.start()
+        send.close()
+        measure = recv.recv()
+        proc.join()
+
+        result = {"name": name, **params, **measure}
+        results.append(result)
+        ns = result["ns_per_cell"]
+        ns_str = "-" if ns is None else f"{ns:.1f}"
+        mib = result["peak_rss_kb"] / 1024
+        print(f"{name:<32} {result['seconds']:>10.4f} {ns_str:>10} {mib:>10.1f}")
+        sys.stdout.flush()
+    return results
+
+
+def compare(old_file: str, new_file: str):
+    with open(old_file, "r") as fp:
+        old = {r["name"]: r for r in json.load(fp)["results"]}
+    with open(new_file, "r") as fp:
+        new = {r["name"]: r for r in json.load(fp)["results"]}
+
+    print(f"{'case':<32} {'old':>10} {'new':>10} {'speedup':>8}")
+    for name, result in new.items():
+        if name not in old:
+            continue
+        t0 = old[name]["seconds"]
+        t1 = result["seconds"]
+        print(f"{name:<32} {t0:>10.4f} {t1:>10.4f} {t0 / t1:>8.2f}")
+
+
+def fixture_cases() -> List[Case]:
+    hmm = _data("PF03373.hmm").read_text()
+    amino = [t.sequence for t in _targets("PF03373_GALNBKIG_cut.amino.fasta")]
+    nucl = [t.sequence for t in _targets("GALNBKIG_cut.fasta")]
+
+    cases: List[Case] = []
+    for kind in ["standard", "frame"]:
+        params = {"kind": kind, "M": 8}
+        cases.append((f"build/{kind}/PF03373", params, _build(kind, hmm)))
+
+    params = {"kind": "standard", "M": 8, "L": sum(len(s) for s in amino)}
+    cases.append(("search/standard/PF03373", params, _search("standard", hmm, amino)))
+    params = {"kind": "frame", "M": 8, "L": sum(len(s) for s in nucl)}
+    cases.append(("search/frame/PF03373", params, _search("frame", hmm, nucl)))
+    return cases
+
+
+def grid_cases(models: Sequence[int], lengths: Sequence[int]) -> List[Case]:
+    from numpy.random import RandomState
+
+    cases: List[Case] = []
+    for M in models:
+        hmm = synthetic_hmm(M, seed=M)
+        for kind in ["standard", "frame"]:
+            params = {"kind": kind, "M": M}
+            cases.append((f"build/{kind}/M{M}", params, _build(kind, hmm)))
+
+            symbols = AMINO if kind == "standard" else "ACGT"
+            for L in lengths:
+                random = RandomState(L)
+                seq = "".join(random.choice(list(symbols), size=L))
+                name = f"search/{kind}/M{M}/L{L}"
+                params = {"kind": kind, "M": M, "L": L}
+                cases.append((name, params, _search(kind, hmm, [seq])))
+    return cases
+
+
+def synthetic_hmm(M: int, seed: int = 0) -> str:
+    """
+    HMMER3 profile of ``M`` nodes with random match emissions.
+    """
+    from numpy import log
+    from numpy.random import RandomState
+
+    random = RandomState(seed)
+    background = random.dirichlet([50.0] * len(AMINO))
+    trans = [0.9, 0.05, 0.05, 0.6, 0.4, 0.7, 0.3]
+
+    def row(probs) -> str:
+        return "  ".join("*" if p == 0 else f"{0.0 - log(p):.5f}" for p in probs)
+
+    lines = [
+        "HMMER3/f [3.1b2 | February 2015]",
+        f"NAME  synthetic{M}",
+        f"ACC   SYN{M:05d}.1",
+        f"LENG  {M}",
+        "ALPH  amino",
+        "RF    no",
+        "MM    no",
+        "CONS  yes",
+        "CS    no",
+        "MAP   yes",
+        "HMM          " + "        ".join(AMINO),
+        "            m->m     m->i     m->d     i->m     i->i     d->m     d->d",
+        f"  COMPO   {row(background)}",
+        f"          {row(background)}",
+        f"          {row(trans[:5] + [1.0, 0.0])}",
+    ]
+    for i in range(1, M + 1):
+        match = random.dirichlet([0.5] * len(AMINO))
+        consensus = AMINO[match.argmax()]
+        lines.append(f"{i:>7}   {row(match)} {i:>6} {consensus} - - -")
+        lines.append(f"          {row(background)}")
+        if i < M:
+            lines.append(f"          {row(trans)}")
+        else:
+            lines.append(f"          {row([0.95, 0.05, 0.0, 0.6, 0.4, 1.0, 0.0])}")
+    lines.append("//")
+    return "\n".join(lines) + "\n"
+
+
+def _build(kind: str, hmm: str):
+    def setup():
+        create_profile = _create_profile(kind)
+
+        def build():
+            with open_hmmer(StringIO(hmm)) as reader:
+                return create_profile(reader.read_profile())
+
+        return build, 0
+
+    return setup
+
+
+def _search(kind: str, hmm: str, sequences: Sequence[str]):
+    def setup():
+        with open_hmmer(StringIO(hmm)) as reader:
+            profile = _create_profile(kind)(reader.read_profile())
+
+        seqs = [_sequence(s, profile.alphabet) for s in sequences]
+        cells = profile.alt_model.length * sum(seq.length for seq in seqs)
+
+        def search():
+            for seq in seqs:
+                profile.search(seq)
+
+        return search, cells
+
+    return setup
+
+
+def _measure(setup, repeat: int, conn):
+    from resource import RUSAGE_SELF, getrusage
+    from statistics import median
+
+    func, cells = setup()
+    func()
+
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    seconds = min(times)
+    ns_per_cell: Optional[float] = None
+    if cells > 0:
+        ns_per_cell = seconds * 1e9 / cells
+
+    conn.send(
+        {
+            "seconds": seconds,
+            "median_seconds": median(times),
+            "repeat": repeat,
+            "cells": cells,
+            "ns_per_cell": ns_per_cell,
+            "peak_rss_kb": getrusage(RUSAGE_SELF).ru_maxrss,
+        }
+    )
+    conn.close()
+
+
+def _create_profile(kind: str):
+    if kind == "standard":
+        return iseq.standard.create_profile
+    return iseq.frame.create_profile
+
+
+def _sequence(sequence: str, alphabet) -> NMMSequence:
+    symbols = sequence.encode()
+    if b"T" not in alphabet.symbols and b"U" in alphabet.symbols:
+        symbols = symbols.replace(b"T", b"U")
+    return NMMSequence(symbols, alphabet)
+
+
+def _targets(filename: str):
+    from iseq.pipeline import read_targets
+
+    return list(read_targets(_data(filename)))
+
+
+def _data(filename: str) -> Path:
+    import iseq._data
+
+    return Path(iseq._data.__file__).parent / filename
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+BGZF File Format
+----------------
+
+BGZF is a series of gzip members, or blocks, each holding at most 64 KiB of
+compressed data and recording its own compressed size in a ``BC`` extra field.
+Any block can be decompressed on its own, so that a position in the uncompressed
+stream is reached from the *virtual offset*
+``(compressed block offset << 16) | offset within the block`` without reading the
+blocks before it. The file ends with an empty block.
+
+A ``.gzi`` index lists the compressed and uncompressed offsets of every block but
+the first, as little-endian 64-bit integers following their count.
+"""
+import io
+import struct
+import zlib
+from typing import IO, List, Tuple
+
+__all__ = ["BGZFWriter", "virtual_offset", "write_gzi"]
+
+# Uncompressed bytes per block, as in htslib, so that even incompressible data
+# fits in a block.
+BLOCK_SIZE = 0xFF00
+
+_HEADER = struct.Struct("<4BI2BH2BHH")
+_TRAILER = struct.Struct("<II")
+_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class BGZFWriter(io.RawIOBase):
+    """
+    Writable BGZF stream.
+
+    Data is cut into blocks of `BLOCK_SIZE` bytes, and blocks are compressed in
+    batches, over ``threads`` threads if more than one. Only `close` writes out
+    the last, partial block, so that `flush` never breaks the fixed block size
+    the virtual offsets are computed from.
+
+    Parameters
+    ----------
+    fp : `IO[bytes]`
+        Binary file, closed together with the stream.
+    level : `int`
+        Compression level.
+    threads : `int`
+        Number of compression threads.
+    """
+
+    def __init__(self, fp: IO[bytes], level: int = 6, threads: int = 1):
+        super().__init__()
+        self._fp = fp
+        self._level = level
+        self._pending = bytearray()
+        self._offset = 0
+        self._uoffset = 0
+        self._blocks: List[Tuple[int, int]] = []
+        self._executor = None
+        if threads > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(threads)
+        self._batch = BLOCK_SIZE * max(1, threads) * 4
+
+    @property
+    def size(self) -> int:
+        """
+        Compressed size of the blocks written so far.
+        """
+        return self._offset
+
+    @property
+    def blocks(self) -> List[Tuple[int, int]]:
+        """
+        Compressed and uncompressed offsets of every block written so far.
+        """
+        return self._blocks
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._pending += data
+        if len(self._pending) >= self._batch:
+            nfull = len(self._pending) // BLOCK_SIZE * BLOCK_SIZE
+            self._write_blocks(self._pending[:nfull])
+            del self._pending[:nfull]
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self._write_blocks(self._pending)
+        self._pending = bytearray()
+        self._fp.write(_EOF)
+        self._fp.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+        super().close()
+
+    def _write_blocks(self, data):
+        chunks = [
+            bytes(data[i : i + BLOCK_SIZE]) for i in range(0, len(data), BLOCK_SIZE)
+        ]
+        if self._executor is None:
+            blocks = map(self._compress, chunks)
+        else:
+            blocks = self._executor.map(self._compress, chunks)
+
+        for chunk, block in zip(chunks, blocks):
+            self._blocks.append((self._offset, self._uoffset))
+            self._fp.write(block)
+            self._offset += len(block)
+            self._uoffset += len(chunk)
+
+    def _compress(self, chunk: bytes) -> bytes:
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, -15)
+        cdata = compressor.compress(chunk) + compressor.flush()
+        bsize = _HEADER.size + len(cdata) + _TRAILER.size
+        header = _HEADER.pack(
+            0x1F, 0x8B, 8, 4, 0, 0, 0xFF, 6, ord("B"), ord("C"), 2, bsize - 1
+        )
+        trailer = _TRAILER.pack(zlib.crc32(chunk), len(chunk))
+        return header + cdata + trailer
+
+
+def virtual_offset(blocks: List[Tuple[int, int]], end: int, uoffset: int) -> int:
+    """
+    Virtual offset of an uncompressed offset.
+
+    Parameters
+    ----------
+    blocks : `List[Tuple[int, int]]`
+        Compressed and uncompressed offsets of the blocks, as `BGZFWriter.blocks`.
+    end : `int`
+        Compressed size of the blocks, as `BGZFWriter.size`, which offsets past
+        the last block point to.
+    uoffset : `int`
+        Uncompressed offset.
+    """
+    i = uoffset // BLOCK_SIZE
+    if i < len(blocks):
+        return (blocks[i][0] << 16) | (uoffset - blocks[i][1])
+    return end << 16
+
+
+def write_gzi(file, blocks: List[Tuple[int, int]]):
+    """
+    Write the ``.gzi`` index of a BGZF file.
+    """
+    entries = blocks[1:]
+    with open(file, "wb") as fp:
+        fp.write(struct.pack("<Q", len(entries)))
+        for coffset, uoffset in entries:
+            fp.write(struct.pack("<QQ", coffset, uoffset))
@@ -0,0 +1,296 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from nmm import Sequence, SequenceABC
+from numpy import ndarray
+
+from .profile import Profile
+
+__all__ = ["SearchPool", "score_many", "search_many"]
+
+# Profiles of the current worker process, given once when it starts.
+_profiles: Any = None
+
+_Chunk = List[Tuple[int, SequenceABC]]
+_Path = Tuple[ndarray, ndarray]
+
+
+class SearchPool:
+    """
+    Worker processes searching sequences against a set of profiles.
+
+    Workers are started once, with the default method of the platform, and are
+    given ``profiles`` when they start. They are reused by every call made until
+    the pool is closed. Tasks name their profile by key, and each worker looks it
+    up in its own copy of ``profiles``: a lazily loaded mapping, such as a
+    `iseq.database.ProfileDatabase`, is then loaded by every worker on demand.
+    Where workers are not forked, ``profiles`` is pickled once per worker, and
+    profiles are pickled as the tables they have been built from.
+
+    Parameters
+    ----------
+    profiles : `Mapping[Hashable, Profile]`
+        Profiles by key.
+    workers : `int`
+        Number of worker processes. ``1`` searches in the calling process.
+    """
+
+    def __init__(self, profiles: Mapping[Hashable, Profile], workers: int):
+        if workers < 1:
+            raise ValueError("`workers` must be a positive integer.")
+
+        self._profiles = profiles
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_initializer, initargs=(profiles,)
+            )
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def search_many(
+        self,
+        key: Hashable,
+        sequences: Iterable[SequenceABC],
+        chunksize: int,
+        ordered: bool,
+        threshold: Optional[float],
+    ) -> Iterator[Any]:
+        """
+        Search several sequences against the profile of a given key.
+
+        See `Profile.search_many`.
+        """
+        if chunksize < 1:
+            raise ValueError("`chunksize` must be a positive integer.")
+        return self._search_many(key, sequences, chunksize, ordered, threshold)
+
+    def score_many(
+        self,
+        key: Hashable,
+        sequences: Iterable[SequenceABC],
+        chunksize: int,
+        prefilter: bool = True,
+    ) -> Iterator[float]:
+        """
+        Score several sequences against the profile of a given key.
+
+        See `Profile.score`.
+        """
+        if chunksize < 1:
+            raise ValueError("`chunksize` must be a positive integer.")
+        return self._score_many(key, sequences, chunksize, prefilter)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _search_many(
+        self,
+        key: Hashable,
+        sequences: Iterable[SequenceABC],
+        chunksize: int,
+        ordered: bool,
+        threshold: Optional[float],
+    ) -> Iterator[Any]:
+        profile = self._profiles[key]
+        executor = self._executor
+        if executor is None:
+            for i, seq in enumerate(sequences):
+                result = profile._search_above(seq, threshold)
+                yield result if ordered else (i, result)
+            return
+
+        chunks = _chunks(enumerate(sequences), chunksize)
+        max_pending = 2 * self._workers
+
+        if ordered:
+            queue: Deque[Tuple[Future, _Chunk]] = deque()
+            for chunk in chunks:
+                args = (key, _symbols(chunk), threshold)
+                queue.append((executor.submit(_search_chunk, *args), chunk))
+                if len(queue) >= max_pending:
+                    future, chunk = queue.popleft()
+                    for _, result in _results(profile, chunk, future):
+                        yield result
+
+            while len(queue) > 0:
+                future, chunk = queue.popleft()
+                for _, result in _results(profile, chunk, future):
+                    yield result
+            return
+
+        pending: Dict[Future, _Chunk] = {}
+        for chunk in chunks:
+            args = (key, _symbols(chunk), threshold)
+            pending[executor.submit(_search_chunk, *args)] = chunk
+            if len(pending) >= max_pending:
+                yield from _drain(profile, pending, FIRST_COMPLETED)
+
+        while len(pending) > 0:
+            yield from _drain(profile, pending, FIRST_COMPLETED)
+
+    def _score_many(
+        self,
+        key: Hashable,
+        sequences: Iterable[SequenceABC],
+        chunksize: int,
+        prefilter: bool,
+    ) -> Iterator[float]:
+        executor = self._executor
+        if executor is None:
+            profile = self._profiles[key]
+            for seq in sequences:
+                yield profile.score(seq, prefilter)
+            return
+
+        chunks = _chunks(enumerate(sequences), chunksize)
+        max_pending = 2 * self._workers
+
+        queue: Deque[Future] = deque()
+        for chunk in chunks:
+            args = (key, _symbols(chunk), prefilter)
+            queue.append(executor.submit(_score_chunk, *args))
+            if len(queue) >= max_pending:
+                yield from queue.popleft().result()
+
+        while len(queue) > 0:
+            yield from queue.popleft().result()
+
+
+def search_many(
+    profile: Profile,
+    sequences: Iterable[SequenceABC],
+    workers: int,
+    chunksize: int,
+    ordered: bool,
+    threshold: Optional[float],
+) -> Iterator[Any]:
+    _check_workers(workers, chunksize)
+    return _search_many(profile, sequences, workers, chunksize, ordered, threshold)
+
+
+def score_many(
+    profile: Profile,
+    sequences: Iterable[SequenceABC],
+    workers: int,
+    chunksize: int,
+    prefilter: bool = True,
+) -> Iterator[float]:
+    _check_workers(workers, chunksize)
+    return _score_many(profile, sequences, workers, chunksize, prefilter)
+
+
+def _check_workers(workers: int, chunksize: int):
+    # Checked before any generator is created, so that invalid arguments are
+    # reported by the call rather than by the first iteration.
+    if workers < 1:
+        raise ValueError("`workers` must be a positive integer.")
+    if chunksize < 1:
+        raise ValueError("`chunksize` must be a positive integer.")
+
+
+def _search_many(
+    profile: Profile,
+    sequences: Iterable[SequenceABC],
+    workers: int,
+    chunksize: int,
+    ordered: bool,
+    threshold: Optional[float],
+) -> Iterator[Any]:
+    with SearchPool({0: profile}, workers) as pool:
+        yield from pool.search_many(0, sequences, chunksize, ordered, threshold)
+
+
+def _score_many(
+    profile: Profile,
+    sequences: Iterable[SequenceABC],
+    workers: int,
+    chunksize: int,
+    prefilter: bool,
+) -> Iterator[float]:
+    with SearchPool({0: profile}, workers) as pool:
+        yield from pool.score_many(0, sequences, chunksize, prefilter)
+
+
+def _initializer(profiles: Mapping[Hashable, Profile]):
+    global _profiles
+    _profiles = profiles
+
+
+def _search_chunk(
+    key: Hashable, chunk: List[bytes], threshold: Optional[float]
+) -> List[Optional[Tuple[float, _Path]]]:
+    profile = _profiles[key]
+    results: List[Optional[Tuple[float, _Path]]] = []
+    for symbols in chunk:
+        seq = Sequence(symbols, profile.alphabet)
+        result = profile._search_above(seq, threshold)
+        if result is None:
+            results.append(None)
+            continue
+        path = result.path
+        results.append((result.loglikelihood, (path.state_ids, path.seq_lens)))
+    return results
+
+
+def _score_chunk(key: Hashable, chunk: List[bytes], prefilter: bool) -> List[float]:
+    profile = _profiles[key]
+    alphabet = profile.alphabet
+    return [profile.score(Sequence(symbols, alphabet), prefilter) for symbols in chunk]
+
+
+def _drain(profile: Profile, pending: Dict[Future, _Chunk], return_when):
+    done: Set[Future] = wait(pending.keys(), return_when=return_when).done
+    for future in done:
+        chunk = pending.pop(future)
+        yield from _results(profile, chunk, future)
+
+
+def _results(profile: Profile, chunk: _Chunk, future: Future):
+    for (i, seq), item in zip(chunk, future.result()):
+        if item is None:
+            yield (i, None)
+            continue
+        loglik, (state_ids, seq_lens) = item
+        # State ids are valid across processes, as models are built in the same
+        # order whichever process builds them.
+        path = profile.alt_model.create_path(state_ids, seq_lens)
+        yield (i, profile._create_result(loglik, seq, path))
+
+
+def _symbols(chunk: _Chunk) -> List[bytes]:
+    return [seq.symbols for _, seq in chunk]
+
+
+def _chunks(items: Iterable[Tuple[int, SequenceABC]], size: int) -> Iterator[_Chunk]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
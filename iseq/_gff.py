@@ -37,7 +37,7 @@ ctg123 . exon            5000  5500  .  +  .  ID=exon00004;Parent=mrna0001
 ctg123 . exon            7000  9000  .  +  .  ID=exon00005;Parent=mrna0001
 ```
 """
-from typing import NamedTuple, List, Union
+from typing import IO, Callable, List, NamedTuple, Optional, Union
 
 GFFItem = NamedTuple(
     "GFFItem",
@@ -55,26 +55,200 @@ GFFItem = NamedTuple(
 )
 
 
+GFFRange = NamedTuple(
+    "GFFRange",
+    [("seqid", str), ("start", int), ("end", int), ("offset", int), ("stop", int)],
+)
+
+
 class GFFWriter:
-    def __init__(self):
+    """
+    GFF3 writer.
+
+    Items are held in memory until `dump` is called, unless the writer is given a
+    file to stream them to. Streamed items are formatted into a buffer that is
+    written out in blocks of about ``block_size`` characters, and on `flush` or
+    `close`.
+
+    Parameters
+    ----------
+    fp : `Optional[IO[str]]`
+        File to stream the items to.
+    block_size : `int`
+        Size of the blocks streamed items are written in.
+    index : `bool`
+        Keep the `index` of the streamed items.
+    """
+
+    def __init__(
+        self,
+        fp: Optional[IO[str]] = None,
+        block_size: int = 1 << 20,
+        index: bool = False,
+    ):
         self._items: List[GFFItem] = []
+        self._fp = fp
+        self._block: List[str] = []
+        self._block_len = 0
+        self._block_size = block_size
+        self._offset = 0
+        self._index: Optional[List[GFFRange]] = [] if index else None
+        self._on_close: Optional[Callable[[], None]] = None
+        if fp is not None:
+            self._write(_HEADER)
 
     def append(self, item: GFFItem):
-        self._items.append(item)
+        if self._fp is None:
+            self._items.append(item)
+            return
+
+        offset = self._offset
+        self._write(_format_item(item))
+        if self._index is not None:
+            self._update_index(item, offset)
+        if self._block_len >= self._block_size:
+            self.flush()
+
+    @property
+    def index(self) -> Optional[List[GFFRange]]:
+        """
+        Runs of consecutive streamed items of a same sequence, if kept.
+
+        Offsets are in bytes of the UTF-8 encoded output, header included.
+        """
+        return self._index
 
-    def dump(self, fp):
-        fp.write("##gff-version 3\n")
+    def dump(self, fp: IO[str]):
+        fp.write(_HEADER)
         for item in self._items:
-            cols = [
-                item.seqid,
-                item.source,
-                item.type,
-                str(item.start),
-                str(item.end),
-                str(item.score),
-                item.strand,
-                str(item.phase),
-                item.attributes,
-            ]
-            fp.write("\t".join(cols))
-            fp.write("\n")
+            fp.write(_format_item(item))
+
+    def flush(self):
+        if self._fp is None or len(self._block) == 0:
+            return
+        self._fp.write("".join(self._block))
+        self._block.clear()
+        self._block_len = 0
+
+    def close(self):
+        """
+        Flush the buffered items and close the file of a writer made by `open_gff`.
+        """
+        self.flush()
+        if self._on_close is not None:
+            on_close = self._on_close
+            self._on_close = None
+            on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _write(self, text: str):
+        self._block.append(text)
+        self._block_len += len(text)
+        if self._index is not None:
+            self._offset += len(text.encode())
+
+    def _update_index(self, item: GFFItem, offset: int):
+        index = self._index
+        if len(index) > 0 and index[-1].seqid == item.seqid:
+            last = index[-1]
+            start = min(last.start, item.start)
+            end = max(last.end, item.end)
+            index[-1] = GFFRange(item.seqid, start, end, last.offset, self._offset)
+        else:
+            r = GFFRange(item.seqid, item.start, item.end, offset, self._offset)
+            index.append(r)
+
+
+def open_gff(
+    file,
+    compression: Optional[str] = None,
+    index: bool = False,
+    threads: int = 1,
+    block_size: int = 1 << 20,
+) -> GFFWriter:
+    """
+    Open a streaming GFF3 writer on a file.
+
+    Parameters
+    ----------
+    file
+        File path.
+    compression : `Optional[str]`
+        ``None`` for plain text, ``"gzip"``, or ``"bgzf"`` for block gzip.
+    index : `bool`
+        Write the indices of a BGZF file on close: ``<file>.gzi``, mapping
+        uncompressed offsets to compressed blocks, and ``<file>.idx``, the
+        coordinate index. Each line of the latter holds a run of features of a
+        same sequence as ``seqid``, lowest ``start``, highest ``end``, and the
+        virtual offsets of the first feature and of the end of the run.
+    threads : `int`
+        Number of BGZF compression threads.
+    block_size : `int`
+        Size of the blocks items are written in.
+    """
+    if index and compression != "bgzf":
+        raise ValueError("Only BGZF files can be indexed.")
+
+    if compression is None:
+        fp = open(file, "w")
+    elif compression == "gzip":
+        import gzip
+
+        fp = gzip.open(file, "wt")
+    elif compression == "bgzf":
+        return _open_bgzf(file, index, threads, block_size)
+    else:
+        raise ValueError(f"Unknown compression `{compression}`.")
+
+    gff = GFFWriter(fp, block_size)
+    gff._on_close = fp.close
+    return gff
+
+
+def _open_bgzf(file, index: bool, threads: int, block_size: int) -> GFFWriter:
+    import io
+
+    from ._bgzf import BGZFWriter, virtual_offset, write_gzi
+
+    raw = BGZFWriter(open(file, "wb"), threads=threads)
+    fp = io.TextIOWrapper(io.BufferedWriter(raw), encoding="utf-8", newline="")
+
+    gff = GFFWriter(fp, block_size, index)
+
+    def on_close():
+        fp.close()
+        if gff.index is None:
+            return
+
+        write_gzi(f"{file}.gzi", raw.blocks)
+        with open(f"{file}.idx", "w") as idx:
+            for r in gff.index:
+                offset = virtual_offset(raw.blocks, raw.size, r.offset)
+                stop = virtual_offset(raw.blocks, raw.size, r.stop)
+                idx.write(f"{r.seqid}\t{r.start}\t{r.end}\t{offset}\t{stop}\n")
+
+    gff._on_close = on_close
+    return gff
+
+
+_HEADER = "##gff-version 3\n"
+
+
+def _format_item(item: GFFItem) -> str:
+    cols = [
+        item.seqid,
+        item.source,
+        item.type,
+        str(item.start),
+        str(item.end),
+        str(item.score),
+        item.strand,
+        str(item.phase),
+        item.attributes,
+    ]
+    return "\t".join(cols) + "\n"
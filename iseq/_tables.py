@@ -0,0 +1,58 @@
+from typing import Any, Dict
+
+from hmmer_reader import HMMERProfile
+from nmm import LPROB_ZERO, lprob_normalize
+from numpy import array, frombuffer, ndarray, uint8
+
+from .model import Transitions
+
+__all__ = ["read_tables"]
+
+Tables = Dict[str, ndarray]
+
+
+def read_tables(reader: HMMERProfile) -> Tables:
+    """
+    Read the emission and transition tables of a HMMER profile.
+
+    Returns
+    -------
+    `Tables`
+        ``symbols`` holds the alphabet symbols; ``null``, ``match``, and
+        ``insert`` the normalized emission log-probabilities of the null state and
+        of every match and insert state; and ``trans`` the normalized transitions
+        into every core node, as ``(MM, MI, MD, IM, II, DM, DD)`` rows.
+    """
+    symbols = reader.alphabet.encode()
+    prob_list = _create_probability_list(symbols)
+
+    match = []
+    insert = []
+    trans = []
+    for m in range(1, reader.M + 1):
+        match.append(prob_list(reader.match(m)))
+        insert.append(prob_list(reader.insert(m)))
+        t = Transitions(**reader.trans(m - 1))
+        t.normalize()
+        trans.append([t.MM, t.MI, t.MD, t.IM, t.II, t.DM, t.DD])
+
+    shape = (reader.M, len(symbols))
+    return {
+        "symbols": frombuffer(symbols, dtype=uint8).copy(),
+        "null": prob_list(reader.insert(0)),
+        "match": array(match, float).reshape(shape),
+        "insert": array(insert, float).reshape(shape),
+        "trans": array(trans, float).reshape((reader.M, 7)),
+    }
+
+
+def _create_probability_list(symbols: bytes):
+    def probability_list(lprob_table: Dict[str, Any]):
+        probs = []
+        for i in range(len(symbols)):
+            key = symbols[i : i + 1].decode()
+            probs.append(lprob_table.get(key, LPROB_ZERO))
+
+        return array(lprob_normalize(probs), float)
+
+    return probability_list
@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from nmm import Interval
+from numpy import arange, concatenate, cumsum, flatnonzero, isin, ndarray
+
+__all__ = ["create_windows", "relabel", "stitch_windows"]
+
+# Path laid out as state ids and emission lengths.
+Piece = Tuple[ndarray, ndarray]
+
+_SPECIAL_EMITTERS = [ord(b"N"), ord(b"J"), ord(b"C")]
+
+
+def create_windows(length: int, window_length: int, overlap: int) -> List[Interval]:
+    """
+    Split ``[0, length)`` into windows of ``window_length`` symbols.
+
+    Consecutive windows overlap by ``overlap`` symbols and the last window ends at
+    ``length``.
+    """
+    stride = window_length - overlap
+    starts = range(0, max(length - overlap, 1), stride)
+    return [Interval(start, min(start + window_length, length)) for start in starts]
+
+
+def stitch_windows(
+    windows: Sequence[Interval],
+    pieces: Sequence[Piece],
+    kinds: ndarray,
+    labels: Tuple[int, int, int],
+) -> Optional[Piece]:
+    """
+    Merge window paths into a single path over the whole sequence.
+
+    Consecutive paths are cut at a position of their overlap where both of them
+    are emitting non-homologous symbols, so that a hit is always taken from a
+    window that has seen it whole. The N, J, and C states of the merged path are
+    then relabelled according to the hits that ended up before and after them.
+
+    Parameters
+    ----------
+    windows : `Sequence[Interval]`
+        Windows, as returned by `create_windows`.
+    pieces : `Sequence[Piece]`
+        Path of each window, as state ids and emission lengths.
+    kinds : `ndarray`
+        First byte of the name of every state, as given by `StateTable.kinds`.
+    labels : `Tuple[int, int, int]`
+        State ids of the N, J, and C states.
+
+    Returns
+    -------
+    `Optional[Piece]`
+        Merged path, or ``None`` if no valid cut or no hit has been found.
+    """
+    cuts: List[Tuple[int, int]] = []
+    for i in range(len(windows) - 1):
+        cut = _find_cut(windows[i], pieces[i], windows[i + 1], pieces[i + 1], kinds)
+        if cut is None:
+            return None
+        cuts.append(cut)
+
+    state_ids: List[ndarray] = []
+    seq_lens: List[ndarray] = []
+    for i, (ids, lens) in enumerate(pieces):
+        start = 0 if i == 0 else cuts[i - 1][1]
+        stop = len(ids) if i == len(pieces) - 1 else cuts[i][0]
+        state_ids.append(ids[start:stop])
+        seq_lens.append(lens[start:stop])
+
+    return relabel(concatenate(state_ids), concatenate(seq_lens), kinds, labels)
+
+
+def relabel(
+    state_ids: ndarray, seq_lens: ndarray, kinds: ndarray, labels: Tuple[int, int, int]
+) -> Optional[Piece]:
+    """
+    Set the N, J, and C states of a path according to the hits around them.
+
+    Non-homologous steps before the first hit become N, those after the last hit
+    become C, and the others become J.
+    """
+    step_kinds = kinds[state_ids]
+    begins = flatnonzero(step_kinds == ord(b"B"))
+    ends = flatnonzero(step_kinds == ord(b"E"))
+    if len(begins) == 0 or len(ends) == 0:
+        return None
+
+    N, J, C = labels
+    emitter = isin(step_kinds, _SPECIAL_EMITTERS)
+    index = arange(len(state_ids))
+
+    state_ids = state_ids.copy()
+    state_ids[emitter] = J
+    state_ids[emitter & (index < begins[0])] = N
+    state_ids[emitter & (index > ends[-1])] = C
+    return (state_ids, seq_lens)
+
+
+def _find_cut(
+    left_window: Interval,
+    left: Piece,
+    right_window: Interval,
+    right: Piece,
+    kinds: ndarray,
+) -> Optional[Tuple[int, int]]:
+    lo = right_window.start
+    hi = left_window.stop
+
+    left_points = _cut_points(left_window.start, left, kinds, lo, hi)
+    right_points = _cut_points(right_window.start, right, kinds, lo, hi)
+    common = left_points.keys() & right_points.keys()
+    if len(common) == 0:
+        return None
+
+    middle = (lo + hi) / 2
+    pos = min(common, key=lambda p: (abs(p - middle), p))
+    return (left_points[pos], right_points[pos])
+
+
+def _cut_points(
+    offset: int, piece: Piece, kinds: ndarray, lo: int, hi: int
+) -> Dict[int, int]:
+    """
+    Map sequence positions within ``[lo, hi]`` to the index of the step starting
+    there, for every step that follows a non-homologous emission and is itself one.
+    """
+    state_ids, seq_lens = piece
+    starts = offset + cumsum(seq_lens) - seq_lens
+    emitter = isin(kinds[state_ids], _SPECIAL_EMITTERS)
+
+    ok = emitter[1:] & emitter[:-1] & (starts[1:] >= lo) & (starts[1:] <= hi)
+    index = flatnonzero(ok) + 1
+    return dict(zip(starts[index].tolist(), index.tolist()))
@@ -0,0 +1,117 @@
+import os
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from numpy import ndarray
+
+__all__ = [
+    "ProfileCache",
+    "cache_directory",
+    "load_tables",
+    "save_tables",
+    "tables_digest",
+]
+
+Tables = Dict[str, ndarray]
+
+# Version of the layout of the cached tables, part of every cache key. It must be
+# bumped whenever the tables a profile is built from change, so that entries
+# written by an older version are never looked up again.
+_LAYOUT_VERSION = 2
+
+
+class ProfileCache:
+    """
+    On-disk cache of compiled profiles.
+
+    A compiled profile is the set of tables a profile is built from, with every
+    inference already carried out. Entries are keyed by the hash of the HMM
+    content together with the build parameters, and stored as ``.npz`` files.
+
+    Parameters
+    ----------
+    directory : `Optional[Union[str, Path]]`
+        Cache directory. Defaults to ``$ISEQ_CACHE_DIR`` if set, or to
+        ``~/.cache/iseq`` otherwise.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None):
+        if directory is None:
+            directory = cache_directory()
+        self._directory = Path(directory)
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def key(self, content: bytes, **params) -> str:
+        """
+        Cache key of an HMM content built with the given parameters.
+
+        It also covers the version of the layout of the cached tables.
+        """
+        h = sha256(content)
+        h.update(f"\0layout={_LAYOUT_VERSION}".encode())
+        for name in sorted(params.keys()):
+            h.update(f"\0{name}={params[name]!r}".encode())
+        return h.hexdigest()
+
+    def load(self, key: str) -> Optional[Tables]:
+        """
+        Tables of a given key, or ``None`` if there is no entry or it cannot be
+        read.
+        """
+        from zipfile import BadZipFile
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return load_tables(path)
+        except (BadZipFile, OSError, ValueError):
+            return None
+
+    def save(self, key: str, tables: Tables):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        save_tables(tmp, tables)
+        os.replace(tmp, path)
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.npz"
+
+
+def cache_directory() -> Path:
+    """
+    Default cache directory: ``$ISEQ_CACHE_DIR`` if set, or ``~/.cache/iseq``.
+    """
+    default = Path.home() / ".cache" / "iseq"
+    return Path(os.environ.get("ISEQ_CACHE_DIR", default))
+
+
+def save_tables(file, tables: Tables):
+    from numpy import savez
+
+    with open(file, "wb") as fp:
+        savez(fp, **tables)
+
+
+def load_tables(file) -> Tables:
+    from numpy import load
+
+    with load(file, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def tables_digest(tables: Tables) -> bytes:
+    """
+    Hash of the content of a set of tables.
+    """
+    h = sha256()
+    for name in sorted(tables.keys()):
+        arr = tables[name]
+        h.update(f"\0{name}:{arr.dtype.str}:{arr.shape}\0".encode())
+        h.update(arr.tobytes())
+    return h.digest()
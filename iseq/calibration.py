@@ -0,0 +1,161 @@
+from typing import NamedTuple, Optional
+
+from nmm import Sequence
+from numpy import ndarray
+
+from .cache import ProfileCache, tables_digest
+from .profile import Profile
+
+__all__ = ["Calibration", "calibrate", "sample_null"]
+
+
+class Calibration(NamedTuple):
+    """
+    Gumbel distribution of the scores of random sequences against a profile.
+
+    The probability of a random sequence scoring at least ``s`` is
+    ``1 - exp(-exp(-lambda_ * (s - mu)))``.
+    """
+
+    mu: float
+    lambda_: float
+
+    def pvalue(self, score):
+        """
+        Probability of a random sequence scoring at least ``score``.
+        """
+        from numpy import exp, expm1
+
+        return -expm1(-exp(-self.lambda_ * (score - self.mu)))
+
+    def evalue(self, score, nsequences: int):
+        """
+        Expected number of random sequences scoring at least ``score`` among
+        ``nsequences`` searched ones.
+        """
+        return nsequences * self.pvalue(score)
+
+    def score(self, evalue: float, nsequences: int) -> float:
+        """
+        Lowest score whose E-value among ``nsequences`` searched ones is at most
+        ``evalue``, that is, the inverse of `evalue`.
+        """
+        from math import inf, log, log1p
+
+        pvalue = evalue / nsequences
+        if pvalue >= 1:
+            return -inf
+        return self.mu - log(-log1p(-pvalue)) / self.lambda_
+
+
+def calibrate(
+    profile: Profile,
+    nsamples: int = 200,
+    length: Optional[int] = None,
+    workers: int = 1,
+    seed: int = 0,
+    cache: Optional[ProfileCache] = None,
+) -> Calibration:
+    """
+    Fit the score distribution of a profile on random sequences.
+
+    ``nsamples`` sequences of ``length`` symbols are drawn from the null model
+    emissions and scored with `Profile.score`, spread over ``workers`` processes,
+    and a Gumbel distribution is fitted to the scores by maximum likelihood. The
+    prefilter is skipped for these sequences, as random sequences are expected
+    to fail it, and the profile itself is left untouched.
+
+    When ``cache`` is given, the parameters are looked up there first and saved
+    there once fitted. They are keyed by the hash of the compiled tables of the
+    profile together with the calibration parameters and the profile settings
+    that change its scores, so the profile must have been built from tables.
+
+    Parameters
+    ----------
+    profile : `Profile`
+        Profile to be calibrated.
+    nsamples : `int`
+        Number of random sequences.
+    length : `Optional[int]`
+        Length of the random sequences. Defaults to 100 symbols per core node
+        span, that is, 100 amino acids or 300 nucleotides.
+    workers : `int`
+        Number of worker processes, as in `Profile.search_many`.
+    seed : `int`
+        Seed of the random number generator.
+    cache : `Optional[ProfileCache]`
+        Cache of the calibration parameters.
+    """
+    from scipy.stats import gumbel_r
+
+    if nsamples < 2:
+        raise ValueError("`nsamples` must be at least 2.")
+    if length is None:
+        length = 100 * profile.alt_model.node_span
+    if length < 1:
+        raise ValueError("`length` must be positive.")
+
+    key: Optional[str] = None
+    if cache is not None:
+        if profile.tables is None:
+            raise ValueError("This profile has not been built from tables.")
+        content = tables_digest(profile.tables)
+        key = cache.key(
+            content,
+            kind="calibration",
+            multiple_hits=profile.multiple_hits,
+            length_error=profile.length_error,
+            window_length=profile.window_length,
+            nsamples=nsamples,
+            length=length,
+            seed=seed,
+        )
+        tables = cache.load(key)
+        if tables is not None and {"mu", "lambda"} <= tables.keys():
+            return Calibration(float(tables["mu"]), float(tables["lambda"]))
+
+    seqs = sample_null(profile, nsamples, length, seed)
+    scores = _scores(profile, seqs, workers)
+    mu, beta = gumbel_r.fit(scores)
+    calibration = Calibration(float(mu), 1.0 / float(beta))
+
+    if cache is not None and key is not None:
+        from numpy import array
+
+        tables = {"mu": array(calibration.mu), "lambda": array(calibration.lambda_)}
+        cache.save(key, tables)
+
+    return calibration
+
+
+def sample_null(
+    profile: Profile, nsamples: int, length: int, seed: int = 0
+) -> ndarray:
+    """
+    Draw random sequences from the emissions of the null model of a profile.
+
+    Returns a ``(nsamples, length)`` array of symbol bytes.
+    """
+    from numpy import exp, frombuffer, uint8
+    from numpy.random import RandomState
+
+    state = profile.null_model.state
+    symbols = frombuffer(profile.alphabet.symbols, dtype=uint8)
+    lprobs = [state.lprob(Sequence(bytes([s]), profile.alphabet)) for s in symbols]
+    probs = exp(lprobs)
+    probs /= probs.sum()
+
+    random = RandomState(seed)
+    return random.choice(symbols, size=(nsamples, length), p=probs)
+
+
+def _scores(profile: Profile, seqs: ndarray, workers: int) -> ndarray:
+    from numpy import fromiter
+
+    from ._executor import score_many
+
+    sequences = (Sequence(row.tobytes(), profile.alphabet) for row in seqs)
+    chunksize = max(1, len(seqs) // (4 * workers))
+
+    scores = score_many(profile, sequences, workers, chunksize, prefilter=False)
+    return fromiter(scores, dtype=float, count=len(seqs))
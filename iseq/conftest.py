@@ -1,6 +1,13 @@
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "iseq-cache"
+    monkeypatch.setenv("ISEQ_CACHE_DIR", str(directory))
+    return directory
+
+
 @pytest.fixture
 def PF03373(tmp_path):
     return _write_file(tmp_path, "PF03373.hmm")
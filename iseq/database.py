@@ -0,0 +1,213 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from hmmer_reader import HMMERProfile
+
+from .profile import Profile
+
+__all__ = ["ProfileDatabase", "ProfileEntry"]
+
+ProfileEntry = NamedTuple(
+    "ProfileEntry", [("offset", int), ("name", str), ("accession", str)]
+)
+
+
+class ProfileDatabase:
+    """
+    Database of the HMMER profiles of a multi-model file.
+
+    The file is indexed once, and the byte offset, name, and accession of each
+    model are kept in a sidecar index next to it, ``<file>.idx``. The index is
+    rebuilt whenever the file changes. Profiles are parsed and built only when
+    asked for, by name, accession, or iteration, and at most ``capacity`` of them
+    are held in memory, the least recently used being dropped first. Profiles held
+    in memory are left out when the database is pickled.
+
+    Parameters
+    ----------
+    file : `Union[str, Path]`
+        HMMER file.
+    factory : `Optional[Callable[[HMMERProfile], Profile]]`
+        Profile builder, such as ``iseq.frame.create_profile``. Defaults to
+        ``iseq.standard.create_profile``.
+    capacity : `int`
+        Maximum number of built profiles to keep in memory.
+    """
+
+    def __init__(
+        self,
+        file: Union[str, Path],
+        factory: Optional[Callable[[HMMERProfile], Profile]] = None,
+        capacity: int = 64,
+    ):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least one.")
+
+        if factory is None:
+            from .standard import create_profile
+
+            factory = create_profile
+
+        self._file = Path(file)
+        self._factory = factory
+        self._capacity = capacity
+        self._profiles: OrderedDict = OrderedDict()
+        self._entries = _load_index(self._file)
+
+        self._keys: Dict[str, int] = {}
+        for i, entry in enumerate(self._entries):
+            self._keys.setdefault(entry.name, i)
+            if entry.accession != "":
+                self._keys.setdefault(entry.accession, i)
+
+    @property
+    def file(self) -> Path:
+        return self._file
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def entries(self) -> List[ProfileEntry]:
+        return self._entries
+
+    @property
+    def names(self) -> List[str]:
+        return [entry.name for entry in self._entries]
+
+    @property
+    def accessions(self) -> List[str]:
+        return [entry.accession for entry in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __getitem__(self, key: str) -> Profile:
+        """
+        Profile of a given name or accession.
+        """
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._profile(self._keys[key])
+
+    def __iter__(self) -> Iterator[Profile]:
+        """
+        Iterate over the profiles, in file order.
+        """
+        for i in range(len(self._entries)):
+            yield self._profile(i)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_profiles"] = OrderedDict()
+        return state
+
+    def read(self, key: str) -> HMMERProfile:
+        """
+        Parse the HMMER profile of a given name or accession.
+        """
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._read(self._keys[key])
+
+    def _profile(self, i: int) -> Profile:
+        profile = self._profiles.get(i)
+        if profile is not None:
+            self._profiles.move_to_end(i)
+            return profile
+
+        profile = self._factory(self._read(i))
+        self._profiles[i] = profile
+        if len(self._profiles) > self._capacity:
+            self._profiles.popitem(last=False)
+        return profile
+
+    def _read(self, i: int) -> HMMERProfile:
+        from io import StringIO
+
+        from hmmer_reader import open_hmmer
+
+        lines = []
+        with open(self._file, "rb") as file:
+            file.seek(self._entries[i].offset)
+            for line in file:
+                lines.append(line)
+                if line.startswith(b"//"):
+                    break
+
+        text = b"".join(lines).decode()
+        with open_hmmer(StringIO(text)) as reader:
+            return reader.read_profile()
+
+
+def _index_path(file: Path) -> Path:
+    return file.with_name(file.name + ".idx")
+
+
+def _load_index(file: Path) -> List[ProfileEntry]:
+    """
+    Entries of a HMMER file, read from its sidecar index if it is up to date.
+
+    The index first line records the size and modification time of the file it
+    has been built from. A stale or unreadable index is rebuilt, and a failure to
+    write it is not an error.
+    """
+    stat = file.stat()
+    stamp = f"{stat.st_size}\t{stat.st_mtime_ns}"
+    path = _index_path(file)
+
+    try:
+        with open(path, "r") as idx:
+            if idx.readline().rstrip("\n") == stamp:
+                entries = []
+                for line in idx:
+                    offset, name, acc = line.rstrip("\n").split("\t")
+                    entries.append(ProfileEntry(int(offset), name, acc))
+                return entries
+    except (OSError, ValueError):
+        pass
+
+    entries = _scan(file)
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    try:
+        with open(tmp, "w") as idx:
+            idx.write(stamp + "\n")
+            for entry in entries:
+                idx.write(f"{entry.offset}\t{entry.name}\t{entry.accession}\n")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+    return entries
+
+
+def _scan(file: Path) -> List[ProfileEntry]:
+    entries: List[ProfileEntry] = []
+    offset = 0
+    start: Optional[int] = None
+    name = ""
+    acc = ""
+
+    with open(file, "rb") as fp:
+        for line in fp:
+            if line.startswith(b"HMMER"):
+                start = offset
+                name = ""
+                acc = ""
+            elif line.startswith(b"NAME "):
+                name = line[5:].strip().decode()
+            elif line.startswith(b"ACC "):
+                acc = line[4:].strip().decode()
+            elif line.startswith(b"//") and start is not None:
+                entries.append(ProfileEntry(start, name, acc))
+                start = None
+            offset += len(line)
+
+    return entries
@@ -0,0 +1,304 @@
+import os
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+__all__ = ["FastaEntry", "FastaWriter", "MappedFasta"]
+
+FastaEntry = NamedTuple(
+    "FastaEntry", [("defline", str), ("offset", int), ("length", int)]
+)
+
+
+class MappedFasta:
+    """
+    Memory-mapped sequences of a FASTA file.
+
+    The sequences are packed once, one byte per symbol and without line breaks,
+    into a companion file ``<name>.seq``, next to an index ``<name>.seq.idx``
+    holding the defline, offset, and length of every record. Both are rebuilt
+    whenever the FASTA file changes. They are kept in the ``fasta`` subdirectory
+    of `iseq.cache.cache_directory`, under a name keyed by the absolute path of
+    the FASTA file, or, if ``sidecar`` is ``True``, next to the FASTA file as
+    ``<file>.seq`` and ``<file>.seq.idx`` when its directory can be written to.
+    The companion file is memory-mapped and
+    sequences are handed out as `memoryview` slices of the map, without being
+    copied, so that resident memory does not grow with the size of the file.
+
+    Parameters
+    ----------
+    file : `Union[str, Path]`
+        FASTA file.
+    sidecar : `bool`
+        Whether to keep the companion files next to the FASTA file.
+    """
+
+    def __init__(self, file: Union[str, Path], sidecar: bool = False):
+        self._file = Path(file)
+        self._entries, seq_path = _load_index(self._file, sidecar)
+        self._names: Dict[str, int] = {}
+        for i, entry in enumerate(self._entries):
+            self._names.setdefault(_name(entry.defline), i)
+
+        self._map: Optional[mmap] = None
+        self._fp = open(seq_path, "rb")
+        if os.fstat(self._fp.fileno()).st_size > 0:
+            self._map = mmap(self._fp.fileno(), 0, access=ACCESS_READ)
+
+    @property
+    def file(self) -> Path:
+        return self._file
+
+    @property
+    def entries(self) -> List[FastaEntry]:
+        return self._entries
+
+    def sequence(self, i: int) -> memoryview:
+        """
+        View of the sequence of the ``i``-th record.
+        """
+        entry = self._entries[i]
+        if self._map is None:
+            return memoryview(b"")
+        return memoryview(self._map)[entry.offset : entry.offset + entry.length]
+
+    def target(self, key: Union[int, str]):
+        """
+        Record given by position or by name as a `iseq.pipeline.Target` item,
+        whose sequence is a view of the map.
+        """
+        from .pipeline import Target
+
+        if isinstance(key, str):
+            if key not in self._names:
+                raise KeyError(key)
+            key = self._names[key]
+        return Target(self._entries[key].defline, self.sequence(key))
+
+    def targets(self) -> Iterator:
+        """
+        Iterate over the records as `iseq.pipeline.Target` items, whose
+        sequences are views of the map.
+        """
+        from .pipeline import Target
+
+        for i, entry in enumerate(self._entries):
+            yield Target(entry.defline, self.sequence(i))
+
+    def close(self):
+        """
+        Close the file.
+
+        The map itself is released once the last view of it is gone.
+        """
+        self._map = None
+        self._fp.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __getitem__(self, key: Union[int, str]) -> memoryview:
+        """
+        Sequence of a record, given by position or by name, the first word of
+        its defline.
+        """
+        if isinstance(key, str):
+            if key not in self._names:
+                raise KeyError(key)
+            key = self._names[key]
+        return self.sequence(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class FastaWriter:
+    """
+    Streaming FASTA writer.
+
+    Records are formatted into a buffer that is written out in blocks of about
+    ``block_size`` characters, and on `flush` or `close`.
+
+    Parameters
+    ----------
+    fp : `IO[str]`
+        File to stream the records to.
+    width : `Optional[int]`
+        Maximum length of the sequence lines. Defaults to ``None``, which writes
+        every sequence on a single line.
+    block_size : `int`
+        Size of the blocks records are written in.
+    """
+
+    def __init__(
+        self, fp: IO[str], width: Optional[int] = None, block_size: int = 1 << 20
+    ):
+        if width is not None and width < 1:
+            raise ValueError("`width` must be positive.")
+        self._fp = fp
+        self._width = width
+        self._block: List[str] = []
+        self._block_len = 0
+        self._block_size = block_size
+
+    def append(self, defline: str, sequence: Union[str, bytes]):
+        if isinstance(sequence, bytes):
+            sequence = sequence.decode()
+
+        text = f">{defline}\n"
+        if self._width is None:
+            text += sequence + "\n"
+        else:
+            w = self._width
+            lines = (sequence[i : i + w] for i in range(0, len(sequence), w))
+            text += "".join(line + "\n" for line in lines)
+
+        self._block.append(text)
+        self._block_len += len(text)
+        if self._block_len >= self._block_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._block) == 0:
+            return
+        self._fp.write("".join(self._block))
+        self._block.clear()
+        self._block_len = 0
+
+    def close(self):
+        """
+        Flush the buffered records. The file itself is left open.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def _name(defline: str) -> str:
+    words = defline.split()
+    return words[0] if len(words) > 0 else ""
+
+
+def _seq_path(base: Path) -> Path:
+    return base.with_name(base.name + ".seq")
+
+
+def _index_path(base: Path) -> Path:
+    return base.with_name(base.name + ".seq.idx")
+
+
+def _cache_base(file: Path) -> Path:
+    from hashlib import sha256
+
+    from .cache import cache_directory
+
+    key = sha256(str(file.resolve()).encode()).hexdigest()[:16]
+    return cache_directory() / "fasta" / f"{key}.{file.name}"
+
+
+def _load_index(file: Path, sidecar: bool) -> Tuple[List[FastaEntry], Path]:
+    """
+    Entries of a FASTA file and the path of its companion file.
+
+    The companion file and its index are looked up in the cache directory, and
+    next to the FASTA file first if ``sidecar`` is ``True``. The index first line
+    records the size and modification time of the FASTA file they have been
+    built from. Stale or unreadable ones are rebuilt in the first of those
+    places they can be written to.
+    """
+    stat = file.stat()
+    stamp = f"{stat.st_size}\t{stat.st_mtime_ns}"
+    cache = _cache_base(file)
+
+    bases = [file, cache] if sidecar else [cache]
+    for base in bases:
+        entries = _read_index(base, stamp)
+        if entries is not None:
+            return entries, _seq_path(base)
+
+    if sidecar:
+        try:
+            return _build_index(file, file, stamp), _seq_path(file)
+        except OSError:
+            pass
+    return _build_index(file, cache, stamp), _seq_path(cache)
+
+
+def _read_index(base: Path, stamp: str) -> Optional[List[FastaEntry]]:
+    try:
+        if not _seq_path(base).exists():
+            return None
+        with open(_index_path(base), "r") as idx:
+            if idx.readline().rstrip("\n") != stamp:
+                return None
+            entries = []
+            for line in idx:
+                offset, length, defline = line.rstrip("\n").split("\t", 2)
+                entries.append(FastaEntry(defline, int(offset), int(length)))
+            return entries
+    except (OSError, ValueError):
+        return None
+
+
+def _build_index(file: Path, base: Path, stamp: str) -> List[FastaEntry]:
+    base.parent.mkdir(parents=True, exist_ok=True)
+    seq_path = _seq_path(base)
+    seq_tmp = seq_path.with_name(f".{seq_path.name}.{os.getpid()}")
+    path = _index_path(base)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+
+    try:
+        entries = _pack(file, seq_tmp)
+        with open(tmp, "w") as idx:
+            idx.write(stamp + "\n")
+            for e in entries:
+                idx.write(f"{e.offset}\t{e.length}\t{e.defline}\n")
+        os.replace(seq_tmp, seq_path)
+        os.replace(tmp, path)
+    except OSError:
+        for leftover in [seq_tmp, tmp]:
+            if leftover.exists():
+                leftover.unlink()
+        raise
+
+    return entries
+
+
+def _pack(file: Path, output: Path) -> List[FastaEntry]:
+    """
+    Write the sequences of a FASTA file back to back, streaming it line by line.
+    """
+    entries: List[FastaEntry] = []
+    defline: Optional[str] = None
+    start = 0
+    offset = 0
+
+    with open(file, "rb") as fp, open(output, "wb") as out:
+        for line in fp:
+            if line.startswith(b">"):
+                if defline is not None:
+                    entries.append(FastaEntry(defline, start, offset - start))
+                defline = line[1:].strip().decode()
+                start = offset
+                continue
+
+            if defline is None:
+                continue
+            symbols = b"".join(line.split())
+            out.write(symbols)
+            offset += len(symbols)
+
+        if defline is not None:
+            entries.append(FastaEntry(defline, start, offset - start))
+
+    return entries
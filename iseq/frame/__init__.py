@@ -1,3 +1,15 @@
-from .profile import create_profile
+from ._decoder import DecodedFragment
+from .profile import (
+    FrameProfile,
+    create_profile,
+    create_profile_from_text,
+    load_profile,
+)
 
-__all__ = ["create_profile"]
+__all__ = [
+    "DecodedFragment",
+    "FrameProfile",
+    "create_profile",
+    "create_profile_from_text",
+    "load_profile",
+]
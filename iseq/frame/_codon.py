@@ -0,0 +1,123 @@
+from typing import List
+
+from nmm import GeneticCode
+from numpy import array, bincount, full, intp, ndarray, zeros
+
+__all__ = ["CodonIndex", "codon_symbols"]
+
+
+def codon_symbols(codon) -> bytes:
+    return b"".join(codon.base(i) for i in range(3))
+
+
+class CodonIndex:
+    """
+    Index of the codons of a genetic code.
+
+    Codons are laid out amino acid after amino acid, following the order of the
+    protein alphabet, so that per-codon quantities can be kept in arrays.
+
+    Parameters
+    ----------
+    gcode : `GeneticCode`
+        Genetic code.
+    bases : `bytes`
+        Base symbols.
+    amino_acids : `bytes`
+        Amino acid symbols.
+    """
+
+    def __init__(self, gcode: GeneticCode, bases: bytes, amino_acids: bytes):
+        self._bases = bases
+        self._amino_acids = amino_acids
+        self._codons: List = []
+        self._symbols: List[bytes] = []
+        amino_acid: List[int] = []
+
+        for i in range(len(amino_acids)):
+            for codon in gcode.codons(amino_acids[i : i + 1]):
+                self._codons.append(codon)
+                self._symbols.append(codon_symbols(codon))
+                amino_acid.append(i)
+
+        self._amino_acid = array(amino_acid, dtype=intp)
+
+        # Bases outside of the alphabet are encoded as `len(bases)`.
+        nbases = len(bases) + 1
+        self._base_index = full(256, len(bases), dtype=intp)
+        for i, base in enumerate(bases):
+            self._base_index[base] = i
+
+        self._ncodons = bincount(self._amino_acid, minlength=len(amino_acids))
+
+        self._base_count = zeros((len(self._symbols), len(bases)), dtype=intp)
+        for i, symbols in enumerate(self._symbols):
+            for s in symbols:
+                self._base_count[i, self._base_index[s]] += 1
+
+        self._translation = full(nbases ** 3, len(amino_acids), dtype=intp)
+        for i, symbols in enumerate(self._symbols):
+            self._translation[self._triplet_code(symbols)] = amino_acid[i]
+
+    @property
+    def bases(self) -> bytes:
+        return self._bases
+
+    @property
+    def amino_acids(self) -> bytes:
+        return self._amino_acids
+
+    @property
+    def codons(self) -> List:
+        return self._codons
+
+    @property
+    def symbols(self) -> List[bytes]:
+        """
+        Base symbols of each codon.
+        """
+        return self._symbols
+
+    @property
+    def amino_acid(self) -> ndarray:
+        """
+        Amino acid index of each codon.
+        """
+        return self._amino_acid
+
+    @property
+    def ncodons(self) -> ndarray:
+        """
+        Number of codons of each amino acid.
+        """
+        return self._ncodons
+
+    @property
+    def base_count(self) -> ndarray:
+        """
+        Number of occurrences of each base in each codon.
+        """
+        return self._base_count
+
+    @property
+    def base_index(self) -> ndarray:
+        """
+        Lookup table from a base byte to its index in the base alphabet.
+        """
+        return self._base_index
+
+    @property
+    def translation(self) -> ndarray:
+        """
+        Lookup table from a triplet code to an amino acid index.
+
+        A triplet of base indices ``(a, b, c)`` has code ``(a * n + b) * n + c``,
+        where ``n`` is the number of bases plus one. Triplets that are not codons
+        of the genetic code translate to ``len(amino_acids)``.
+        """
+        return self._translation
+
+    def _triplet_code(self, symbols: bytes) -> int:
+        n = len(self._bases) + 1
+        a, b, c = (self._base_index[s] for s in symbols)
+        return int((a * n + b) * n + c)
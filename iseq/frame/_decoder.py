@@ -0,0 +1,114 @@
+from typing import Dict, List, NamedTuple
+
+from nmm import Sequence as NMMSequence
+from numpy import ndarray
+
+from ._codon import CodonIndex, codon_symbols
+from .path import FramePath
+
+__all__ = ["DecodedFragment", "FrameDecoder"]
+
+# A frame state emits from one to five bases.
+_MAX_LEN = 5
+
+DecodedFragment = NamedTuple(
+    "DecodedFragment",
+    [("codons", bytes), ("amino_acids", bytes), ("homologous", bool)],
+)
+
+
+class FrameDecoder:
+    """
+    Decoder of frame paths into their most likely codons and amino acids.
+
+    The most likely codon of a state given the bases it emits is found with
+    `FrameState.decode` once for every distinct pair of state and emitted bases,
+    and memoized. Whole paths are then decoded with array lookups.
+
+    Parameters
+    ----------
+    codon_index : `CodonIndex`
+        Index of the codons of the genetic code of the profile.
+    """
+
+    def __init__(self, codon_index: CodonIndex):
+        from numpy import array, cumsum, frombuffer, uint8
+
+        self._codon_index = codon_index
+        self._ids = {symbols: i for i, symbols in enumerate(codon_index.symbols)}
+        self._memo: Dict[int, int] = {}
+
+        symbols = b"".join(codon_index.symbols)
+        self._codons = frombuffer(symbols, dtype=uint8).reshape((-1, 3))
+        amino_acids = frombuffer(codon_index.amino_acids, dtype=uint8)
+        self._amino_acids = amino_acids[codon_index.amino_acid]
+
+        # Emitted bases are numbered in base ``n``, the number of bases plus one,
+        # after every emission of fewer bases.
+        n = len(codon_index.bases) + 1
+        sizes = array([n ** k for k in range(_MAX_LEN + 1)])
+        self._len_offset = cumsum(sizes) - sizes
+        self._nemissions = int(sizes.sum())
+
+    def decode_path(self, path: FramePath, symbols: bytes) -> ndarray:
+        """
+        Codon index of every step of a path, ``-1`` for steps emitting nothing.
+
+        Parameters
+        ----------
+        path : `FramePath`
+            Path.
+        symbols : `bytes`
+            Sequence emitted by the path.
+        """
+        from numpy import array, cumsum, frombuffer, full, intp, uint8, unique, zeros
+
+        seq_lens = path.seq_lens
+        codons = full(len(seq_lens), -1, dtype=intp)
+        emits = seq_lens > 0
+        lens = seq_lens[emits]
+        if len(lens) == 0:
+            return codons
+        if lens.max() > _MAX_LEN:
+            raise ValueError(f"Frame states emit at most {_MAX_LEN} bases.")
+        starts = (cumsum(seq_lens) - seq_lens)[emits]
+
+        idx = self._codon_index.base_index[frombuffer(symbols, dtype=uint8)]
+        n = len(self._codon_index.bases) + 1
+        emission = zeros(len(lens), dtype=intp)
+        for j in range(_MAX_LEN):
+            within = lens > j
+            emission[within] = emission[within] * n + idx[starts[within] + j]
+        emission += self._len_offset[lens]
+
+        keys = path.state_ids[emits] * self._nemissions + emission
+        uniq, first, inverse = unique(keys, return_index=True, return_inverse=True)
+
+        memo = self._memo
+        found: List[int] = []
+        for key, i in zip(uniq.tolist(), first.tolist()):
+            codon = memo.get(key)
+            if codon is None:
+                state = path.table[key // self._nemissions]
+                bases = symbols[starts[i] : starts[i] + lens[i]]
+                codon = self._decode(state, bases)
+                memo[key] = codon
+            found.append(codon)
+
+        codons[emits] = array(found, dtype=intp)[inverse.reshape(-1)]
+        return codons
+
+    def create_fragment(self, codons: ndarray, homologous: bool) -> DecodedFragment:
+        """
+        Decoded fragment of the codon indices given by `decode_path`.
+        """
+        codons = codons[codons >= 0]
+        return DecodedFragment(
+            self._codons[codons].tobytes(),
+            self._amino_acids[codons].tobytes(),
+            homologous,
+        )
+
+    def _decode(self, state, bases: bytes) -> int:
+        codon = state.decode(NMMSequence(bases, state.alphabet))[0]
+        return self._ids[codon_symbols(codon)]
@@ -1,18 +1,24 @@
-from typing import Iterator, Tuple
+from typing import Iterator, Optional, Tuple
 
 from nmm import SequenceABC
 from ..fragment import Fragment
+from ._decoder import DecodedFragment, FrameDecoder
 from .path import FramePath
 from .step import FrameStep
 
 
 class FrameFragment(Fragment):
     def __init__(
-        self, sequence: SequenceABC, path: FramePath, homologous: bool,
+        self,
+        sequence: SequenceABC,
+        path: FramePath,
+        homologous: bool,
+        decoder: Optional[FrameDecoder] = None,
     ):
         super().__init__(homologous)
         self._sequence = sequence
         self._path = path
+        self._decoder = decoder
 
     @property
     def sequence(self) -> SequenceABC:
@@ -25,28 +31,14 @@ class FrameFragment(Fragment):
             yield (self._sequence.symbols[start:end], step)
             start = end
 
-    # def decode(self) -> CodonFragment:
-    #     nseq: List[Codon] = []
-    #     npath = CodonPath()
-
-    #     start: int = 0
-    #     seq = self.sequence
-    #     for step in self._path.steps():
-    #         if isinstance(step.state, MuteState):
-    #             mstate = MuteState(step.state.name, step.state.alphabet)
-    #             npath.append_codon_step(mstate, 0)
-    #         else:
-    #             assert isinstance(step.state, FrameState)
-
-    #             codon = step.state.decode(seq[start : start + step.seq_len])[0]
-    #             nseq.append(codon)
-
-    #             cstate = CodonState(step.state.name, step.state.alphabet, {codon: LOG1})
-    #             npath.append_codon_step(cstate, 3)
-
-    #         start += step.seq_len
-
-    #     return CodonFragment(nseq, npath, self.homologous)
+    def decode(self) -> DecodedFragment:
+        """
+        Most likely codon of every emitting step, and its amino acid.
+        """
+        if self._decoder is None:
+            raise ValueError("This fragment has no decoder.")
+        codons = self._decoder.decode_path(self._path, self._sequence.symbols)
+        return self._decoder.create_fragment(codons, self.homologous)
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}:{str(self)}>"
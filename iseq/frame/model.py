@@ -1,6 +1,7 @@
-from typing import Dict, List, Sequence, Tuple, Union
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Tuple, Union
 
-from nmm import CData, CSequence, FrameState, MuteState
+from nmm import CSequence, FrameState, MuteState
 
 from ..model import AltModel, Node, NullModel, SpecialNode, Transitions
 from .path import FramePath
@@ -90,6 +91,10 @@ class FrameNullModel(NullModel):
 
 
 class FrameAltModel(AltModel):
+    # A frame state emits a codon most of the time.
+    _node_span: int = 3
+    _path_type = FramePath
+
     def __init__(
         self,
         special_node: FrameSpecialNode,
@@ -97,15 +102,6 @@ class FrameAltModel(AltModel):
     ):
         self._special_node = special_node
         self._core_nodes = [nt[0] for nt in nodes_trans]
-        self._states: Dict[CData, Union[MuteState, FrameState]] = {}
-
-        for node in self._core_nodes:
-            for state in node.states():
-                self._states[state.imm_state] = state
-
-        for state in special_node.states():
-            self._states[state.imm_state] = state
-
         super().__init__(special_node, nodes_trans)
 
     @property
@@ -120,17 +116,9 @@ class FrameAltModel(AltModel):
         return self._special_node
 
     def viterbi(
-        self, seq: CSequence, window_length: int = 0
+        self,
+        seq: CSequence,
+        window_length: int = 0,
+        executor: Optional[Executor] = None,
     ) -> Tuple[float, FramePath]:
-        # score, path = super().viterbi(seq)
-        results = super().viterbi(seq, window_length)
-        # TODO: implement multiple windows
-        assert len(results) == 1
-
-        path = results[0].path
-        score = results[0].loglikelihood
-
-        steps = [(self._states[step.state.imm_state], step.seq_len) for step in path]
-        new_path = FramePath(steps)
-
-        return (score, new_path)
+        return self._viterbi(seq, window_length, executor)
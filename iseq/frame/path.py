@@ -1,26 +1,22 @@
-from typing import Sequence, Tuple, Union
+from typing import Union
 
-from nmm import CPath, FrameState, MuteState, create_imm_path
+from nmm import FrameState, MuteState
 
+from ..path import CompactPath
 from .step import FrameStep
 
 
-class FramePath(CPath):
+class FramePath(CompactPath):
     """
     Path for frame profile.
 
-    Parameters
-    ----------
-    steps : `Sequence[Tuple[Union[MuteState, FrameState], int]]`
-        Steps.
+    Steps are created as `FrameStep` objects on access only. See `CompactPath`.
     """
 
-    def __init__(self, steps: Sequence[Tuple[Union[MuteState, FrameState], int]]):
-        self.__steps = [FrameStep(step[0], step[1]) for step in steps]
-        super().__init__(create_imm_path(self.__steps), self.__steps)
+    def _create_step(
+        self, state: Union[MuteState, FrameState], seq_len: int
+    ) -> FrameStep:
+        return FrameStep(state, seq_len)
 
     def __getitem__(self, i) -> FrameStep:
-        return self.__steps[i]
-
-    def __repr__(self):
-        return f"<{self.__class__.__name__}:{str(self)}>"
+        return super().__getitem__(i)
@@ -0,0 +1,52 @@
+from typing import Sequence
+
+from nmm import LPROB_ZERO, SequenceABC
+from numpy import frombuffer, uint8
+
+from ..prefilter import UngappedFilter
+from ._codon import CodonIndex
+
+__all__ = ["FrameUngappedFilter"]
+
+
+class FrameUngappedFilter(UngappedFilter):
+    """
+    Ungapped filter for nucleotide sequences against a protein profile.
+
+    The sequence is translated in its three frames, each translation is scored by
+    `UngappedFilter`, and the best score is taken. Frameshifts are not modelled.
+
+    Parameters
+    ----------
+    codon_index : `CodonIndex`
+        Codons of the genetic code in use.
+    match_lprobs : `Sequence[Sequence[float]]`
+        Amino acid match emission log-probabilities, one row per core node.
+    null_lprobs : `Sequence[float]`
+        Amino acid null model emission log-probabilities.
+    """
+
+    def __init__(
+        self,
+        codon_index: CodonIndex,
+        match_lprobs: Sequence[Sequence[float]],
+        null_lprobs: Sequence[float],
+    ):
+        super().__init__(codon_index.amino_acids, match_lprobs, null_lprobs)
+        self._codon_index = codon_index
+
+    def score(self, seq: SequenceABC) -> float:
+        idx = self._codon_index
+        n = len(idx.bases) + 1
+        bases = idx.base_index[frombuffer(seq.symbols, dtype=uint8)]
+
+        best = LPROB_ZERO
+        for frame in range(3):
+            ncodons = (len(bases) - frame) // 3
+            if ncodons <= 0:
+                continue
+            triplets = bases[frame : frame + 3 * ncodons].reshape(ncodons, 3)
+            codes = (triplets[:, 0] * n + triplets[:, 1]) * n + triplets[:, 2]
+            best = max(best, self._score_codes(idx.translation[codes]))
+
+        return best
@@ -1,5 +1,7 @@
-from math import log
-from typing import Any, Dict, List, Sequence, Tuple
+from concurrent.futures import Executor
+from os import getpid
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from hmmer_reader import HMMERProfile
 
@@ -8,14 +10,19 @@ from nmm import (
     Base,
     BaseTable,
     CodonTable,
+    CSequence,
     GeneticCode,
-    LPROB_ZERO,
     FrameState,
     MuteState,
-    AlphabetTable,
-    lprob_normalize,
+    Sequence as NMMSequence,
 )
-from .result import FrameSearchResult
+from numpy import array, frombuffer, ndarray, uint8, vstack
+
+from ._codon import CodonIndex
+from ._decoder import FrameDecoder
+from .path import FramePath
+from .prefilter import FrameUngappedFilter
+from .result import FrameSearchResult, StrandSearchResult
 from .model import (
     FrameAltModel,
     FrameNode,
@@ -23,8 +30,15 @@ from .model import (
     FrameSpecialNode,
     Transitions,
 )
+from .._tables import read_tables
+from ..cache import ProfileCache, load_tables
 from ..profile import Profile
 
+# Thread pool the reverse strands are searched on, see `_strands_executor`.
+_strands: Optional[Executor] = None
+_strands_pid = 0
+_strands_lock = Lock()
+
 
 class FrameStateFactory:
     def __init__(
@@ -34,17 +48,87 @@ class FrameStateFactory:
         self._prot_abc = prot_abc
         self._gcode = gcode
         self._epsilon = epsilon
+        self._codon_index = CodonIndex(gcode, base.symbols, prot_abc.symbols)
+
+    def create(self, name: bytes, tables: Tuple[BaseTable, CodonTable]) -> FrameState:
+        """
+        Create a frame state.
+
+        States created from the same tables share them.
+
+        Parameters
+        ----------
+        name : `bytes`
+            State name.
+        tables : `Tuple[BaseTable, CodonTable]`
+            Base and codon tables, as returned by `create_tables`.
+        """
+        return FrameState(name, tables[0], tables[1], self._epsilon)
+
+    def create_tables(
+        self, codon_lprobs: ndarray, base_lprobs: ndarray
+    ) -> Tuple[BaseTable, CodonTable]:
+        """
+        Create the emission tables of a frame state.
+
+        Parameters
+        ----------
+        codon_lprobs : `ndarray`
+            Codon log-probabilities, following `CodonIndex.codons`.
+        base_lprobs : `ndarray`
+            Base log-probabilities, following the base alphabet.
+        """
+        codons = self._codon_index.codons
+        bases = _split(self._base.symbols)
+        codon_table = CodonTable.create(
+            self._base, {c: float(lp) for c, lp in zip(codons, codon_lprobs)}
+        )
+        base_table = BaseTable.create(
+            self._base, {b: float(lp) for b, lp in zip(bases, base_lprobs)}
+        )
+        return (base_table, codon_table)
+
+    def infer(self, aa_lprobs: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Infer codon and base log-probabilities from amino acid ones.
+
+        The probability of an amino acid is evenly split among its codons, and
+        the probability of a base is the average over the three codon positions.
+        Every state is handled at once.
+
+        Parameters
+        ----------
+        aa_lprobs : `ndarray`
+            Amino acid log-probabilities, one row per state.
 
-    def create(self, name: bytes, prot_abct: AlphabetTable) -> FrameState:
-        codon_lprobs = _infer_codon_lprobs(prot_abct, self._gcode)
-        base_lprobs = _infer_base_lprobs(codon_lprobs, self._alphabet)
-        base_table = BaseTable.create(self._alphabet, base_lprobs)
-        codon_table = CodonTable.create(self._alphabet, codon_lprobs)
-        return FrameState(name, base_table, codon_table, self._epsilon)
+        Returns
+        -------
+        `Tuple[ndarray, ndarray]`
+            Codon and base log-probabilities, one row per state.
+        """
+        from numpy import errstate, log, newaxis
+        from scipy.special import logsumexp
+
+        idx = self._codon_index
+        aa = idx.amino_acid
+
+        codon_lprobs = aa_lprobs[:, aa] - log(idx.ncodons[aa])
+        codon_lprobs -= logsumexp(codon_lprobs, axis=1, keepdims=True)
+
+        with errstate(divide="ignore"):
+            lcount = log(idx.base_count)
+        joint = codon_lprobs[:, :, newaxis] + lcount[newaxis, :, :]
+        base_lprobs = logsumexp(joint, axis=1) - log(3)
+
+        return (codon_lprobs, base_lprobs)
 
     @property
-    def bases(self) -> Alphabet:
-        return self._alphabet
+    def bases(self) -> Base:
+        return self._base
+
+    @property
+    def codon_index(self) -> CodonIndex:
+        return self._codon_index
 
     @property
     def genetic_code(self) -> GeneticCode:
@@ -59,27 +143,35 @@ class FrameProfile(Profile):
     def __init__(
         self,
         fstate_factory: FrameStateFactory,
-        aa_lprobs: Dict[bytes, float],
+        null_tables: Tuple[BaseTable, CodonTable],
         nodes_trans: Sequence[Tuple[FrameNode, Transitions]],
+        prefilter: Optional[FrameUngappedFilter] = None,
+        tables: Optional[Dict[str, ndarray]] = None,
     ):
-        super().__init__()
+        super().__init__(fstate_factory.bases, prefilter, tables)
+        self._epsilon = fstate_factory.epsilon
+        self._decoder = FrameDecoder(fstate_factory.codon_index)
 
-        R = fstate_factory.create(b"R", aa_lprobs)
+        R = fstate_factory.create(b"R", null_tables)
         self._null_model = FrameNullModel(R)
 
         special_node = FrameSpecialNode(
             S=MuteState(b"S", fstate_factory.bases),
-            N=fstate_factory.create(b"N", aa_lprobs),
+            N=fstate_factory.create(b"N", null_tables),
             B=MuteState(b"B", fstate_factory.bases),
             E=MuteState(b"E", fstate_factory.bases),
-            J=fstate_factory.create(b"J", aa_lprobs),
-            C=fstate_factory.create(b"C", aa_lprobs),
+            J=fstate_factory.create(b"J", null_tables),
+            C=fstate_factory.create(b"C", null_tables),
             T=MuteState(b"T", fstate_factory.bases),
         )
 
         self._alt_model = FrameAltModel(special_node, nodes_trans)
         self._set_fragment_length()
 
+    @property
+    def epsilon(self) -> float:
+        return self._epsilon
+
     @property
     def null_model(self) -> FrameNullModel:
         return self._null_model
@@ -88,86 +180,196 @@ class FrameProfile(Profile):
     def alt_model(self) -> FrameAltModel:
         return self._alt_model
 
-    def search(self, seq: bytes) -> FrameSearchResult:
-        self._set_target_length(len(seq))
-        score0 = self.null_model.likelihood(seq)
-        score1, path = self.alt_model.viterbi(seq)
-        score = score1 - score0
-        return FrameSearchResult(score, seq, path)
-
-
-def create_profile(reader: HMMERProfile, epsilon: float = 0.1) -> FrameProfile:
+    def search_strands(
+        self, seq: CSequence
+    ) -> Tuple[StrandSearchResult, StrandSearchResult]:
+        """
+        Search both strands of a sequence.
+
+        The reverse complement is built once, and the ``"-"`` strand is searched
+        on a thread pool shared by the profiles of the process while the ``"+"``
+        strand is searched by the calling thread. Each search takes a working
+        copy of the models of its own, and the dynamic programming releases the
+        GIL, so that both strands are scanned at the same time.
+
+        Returns
+        -------
+        `Tuple[StrandSearchResult, StrandSearchResult]`
+            Results of the ``"+"`` and ``"-"`` strands, whose intervals are given
+            in forward strand coordinates.
+        """
+        rseq = NMMSequence(reverse_complement(seq.symbols), self.alphabet)
+        minus = _strands_executor().submit(self.search, rseq)
+        plus = self.search(seq)
+        return (
+            StrandSearchResult("+", plus, seq.length),
+            StrandSearchResult("-", minus.result(), seq.length),
+        )
 
-    base = Base(Alphabet(b"ACGU", b"X"))
-    prot = Alphabet(reader.alphabet.encode(), b"X")
+    def _from_tables(self):
+        return create_from_tables
 
-    prob_list = _create_probability_list(prot.symbols)
+    def _create_result(
+        self, loglik: float, seq: CSequence, path: FramePath
+    ) -> FrameSearchResult:
+        return FrameSearchResult(loglik, seq, path, self._decoder)
 
-    null_lprobs = prob_list(reader.insert(0))
-    ffact = FrameStateFactory(base, prot, GeneticCode(base), epsilon)
 
-    nodes_trans: List[Tuple[FrameNode, Transitions]] = []
+def _strands_executor() -> Executor:
+    """
+    Thread pool of the current process the reverse strands are searched on.
 
-    breakpoint()
-    for m in range(1, reader.M + 1):
-        M = ffact.create(
-            f"M{m}".encode(), AlphabetTable(prot, prob_list(reader.match(m)))
-        )
-        I = ffact.create(
-            f"I{m}".encode(), AlphabetTable(prot, prob_list(reader.insert(m)))
-        )
-        D = MuteState(f"D{m}".encode(), base)
+    It is created on first use, and again in a forked process, which does not
+    inherit the threads of its parent.
+    """
+    global _strands, _strands_pid
 
-        node = FrameNode(M, I, D,)
+    with _strands_lock:
+        if _strands is None or _strands_pid != getpid():
+            from concurrent.futures import ThreadPoolExecutor
 
-        trans = Transitions(**reader.trans(m - 1))
-        trans.normalize()
+            _strands = ThreadPoolExecutor()
+            _strands_pid = getpid()
+        return _strands
 
-        nodes_trans.append((node, trans))
 
-    return FrameProfile(ffact, null_lprobs, nodes_trans)
+def reverse_complement(symbols: bytes) -> bytes:
+    """
+    Reverse complement of a nucleotide sequence.
 
+    Both ``T`` and ``U`` complement ``A``, which complements to ``U`` if the
+    sequence has any ``U`` and to ``T`` otherwise. Other symbols are kept.
+    """
+    table = _COMPLEMENT_RNA if b"U" in symbols else _COMPLEMENT_DNA
+    return symbols[::-1].translate(table)
 
-def _infer_codon_lprobs(aa_lprobs: Dict[bytes, float], gencode: GeneticCode):
-    from numpy import logaddexp
 
-    codon_lprobs = []
-    lprob_norm = LPROB_ZERO
-    for aa, lprob in aa_lprobs.items():
+def create_profile(reader: HMMERProfile, epsilon: float = 0.1) -> FrameProfile:
+    """
+    Create a frame profile from a HMMER profile.
+
+    Parameters
+    ----------
+    reader : `HMMERProfile`
+        HMMER profile.
+    epsilon : `float`
+        Frameshift probability.
+    """
+    return create_from_tables(compile_tables(read_tables(reader), epsilon))
+
+
+def create_profile_from_text(
+    text: str, epsilon: float = 0.1, cache: Optional[ProfileCache] = None
+) -> FrameProfile:
+    """
+    Create a frame profile from the text of a HMMER profile.
+
+    The text is hashed and looked up in ``cache`` before being parsed, so a
+    cached profile is neither parsed nor inferred again. An entry that cannot be
+    read or built from is taken as missing, and written again.
+
+    Parameters
+    ----------
+    text : `str`
+        Text of a single HMMER profile.
+    epsilon : `float`
+        Frameshift probability.
+    cache : `Optional[ProfileCache]`
+        Cache of compiled profiles to look up first and to store into.
+    """
+    from io import StringIO
+
+    from hmmer_reader import open_hmmer
+
+    key = None
+    if cache is not None:
+        key = cache.key(text.encode(), kind="frame", epsilon=epsilon)
+        compiled = cache.load(key)
+        if compiled is not None:
+            try:
+                return create_from_tables(compiled)
+            except (IndexError, KeyError, ValueError):
+                pass
+
+    with open_hmmer(StringIO(text)) as reader:
+        compiled = compile_tables(read_tables(reader.read_profile()), epsilon)
+
+    if cache is not None and key is not None:
+        cache.save(key, compiled)
+    return create_from_tables(compiled)
+
+
+def load_profile(file) -> FrameProfile:
+    """
+    Load a frame profile saved by `Profile.save`.
+    """
+    return create_from_tables(load_tables(file))
+
+
+def compile_tables(tables: Dict[str, ndarray], epsilon: float) -> Dict[str, ndarray]:
+    """
+    Add the codon and base tables of every frame state to the amino acid tables.
+
+    States with identical amino acid emissions share a single row of ``codon`` and
+    ``base``, inferred only once. ``table`` maps every state to its row: the null
+    state first, then the match states, and then the insert states.
+    """
+    from numpy import unique
+
+    ffact = _create_factory(_BASES, tables["symbols"].tobytes(), epsilon)
+    aa_lprobs = vstack([tables["null"], tables["match"], tables["insert"]])
+    aa_lprobs, table = unique(aa_lprobs, axis=0, return_inverse=True)
+    codon_lprobs, base_lprobs = ffact.infer(aa_lprobs)
+
+    compiled = dict(tables)
+    compiled["bases"] = frombuffer(_BASES, dtype=uint8).copy()
+    compiled["epsilon"] = array(epsilon)
+    compiled["codon"] = codon_lprobs
+    compiled["base"] = base_lprobs
+    compiled["table"] = table.reshape(-1)
+    return compiled
+
+
+def create_from_tables(tables: Dict[str, ndarray]) -> FrameProfile:
+    if "codon" not in tables or "table" not in tables:
+        raise ValueError("Tables have not been compiled for a frame profile.")
+
+    bases = tables["bases"].tobytes()
+    epsilon = float(tables["epsilon"])
+    ffact = _create_factory(bases, tables["symbols"].tobytes(), epsilon)
+
+    lprobs = zip(tables["codon"], tables["base"])
+    ftables = [ffact.create_tables(codon, base) for codon, base in lprobs]
+    table = tables["table"]
+    nmatches = tables["match"].shape[0]
 
-        codons = gencode.codons(aa)
-        if len(codons) == 0:
-            continue
+    nodes_trans: List[Tuple[FrameNode, Transitions]] = []
 
-        norm = log(len(codons))
-        for codon in codons:
-            codon_lprobs.append((codon, lprob - norm))
-            lprob_norm = logaddexp(lprob_norm, codon_lprobs[-1][1])
+    for m in range(1, nmatches + 1):
+        M = ffact.create(f"M{m}".encode(), ftables[table[m]])
+        I = ffact.create(f"I{m}".encode(), ftables[table[m + nmatches]])
+        D = MuteState(f"D{m}".encode(), ffact.bases)
 
-    codon_lprobs = [(i[0], i[1] - lprob_norm) for i in codon_lprobs]
-    return dict(codon_lprobs)
+        node = FrameNode(M, I, D)
+        trans = Transitions(*tables["trans"][m - 1].tolist())
 
+        nodes_trans.append((node, trans))
 
-def _infer_base_lprobs(codon_lprobs, alphabet: Alphabet):
-    from scipy.special import logsumexp
+    match_lprobs = tables["match"]
+    prefilter = FrameUngappedFilter(ffact.codon_index, match_lprobs, tables["null"])
+    return FrameProfile(ffact, ftables[table[0]], nodes_trans, prefilter, tables)
 
-    lprobs: Dict[Base, list] = {Base(sym): [] for sym in alphabet.symbols}
-    lprob_norm = log(3)
-    for codon, lprob in codon_lprobs.items():
-        lprobs[codon.base(0)] += [lprob - lprob_norm]
-        lprobs[codon.base(1)] += [lprob - lprob_norm]
-        lprobs[codon.base(2)] += [lprob - lprob_norm]
 
-    return {b: logsumexp(lp) for b, lp in lprobs.items()}
+_BASES = b"ACGU"
+_COMPLEMENT_DNA = bytes.maketrans(b"ACGTUacgtu", b"TGCAAtgcaa")
+_COMPLEMENT_RNA = bytes.maketrans(b"ACGTUacgtu", b"UGCAAugcaa")
 
 
-def _create_probability_list(symbols: bytes):
-    def probability_list(lprob_table: Dict[str, Any]):
-        probs = []
-        for i in range(len(symbols)):
-            key = symbols[i : i + 1].decode()
-            probs.append(lprob_table.get(key, LPROB_ZERO))
+def _create_factory(bases: bytes, amino_acids: bytes, epsilon: float):
+    base = Base(Alphabet(bases, b"X"))
+    prot = Alphabet(amino_acids, b"X")
+    return FrameStateFactory(base, prot, GeneticCode(base), epsilon)
 
-        return lprob_normalize(probs).tolist()
 
-    return probability_list
+def _split(symbols: bytes) -> List[bytes]:
+    return [symbols[i : i + 1] for i in range(len(symbols))]
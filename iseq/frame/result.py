@@ -1,52 +1,95 @@
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
 from nmm import Interval, SequenceABC
 
 from ..result import SearchResult
+from ._decoder import DecodedFragment, FrameDecoder
 from .fragment import FrameFragment
 from .path import FramePath
 
 
 class FrameSearchResult(SearchResult):
-    def __init__(self, loglik: float, sequence: SequenceABC, path: FramePath):
-        self._loglik = loglik
-        self._fragments: List[FrameFragment] = []
-        self._intervals: List[Interval] = []
-
-        steps = list(path)
-        for fragi, stepi, homologous in self._create_fragments(path):
-            substeps = steps[stepi.start : stepi.stop]
-            fragment_path = FramePath([(s.state, s.seq_len) for s in substeps])
-            seq = sequence.slice(fragi)
-            frag = FrameFragment(seq, fragment_path, homologous)
-            self._fragments.append(frag)
-            self._intervals.append(fragi)
+    def __init__(
+        self,
+        loglik: float,
+        sequence: SequenceABC,
+        path: FramePath,
+        decoder: Optional[FrameDecoder] = None,
+    ):
+        super().__init__(loglik, sequence, path)
+        self._decoder = decoder
 
     @property
-    def fragments(self) -> Sequence[FrameFragment]:
-        return self._fragments
+    def path(self) -> FramePath:
+        return self._path
 
     @property
-    def intervals(self) -> Sequence[Interval]:
-        return self._intervals
+    def fragments(self) -> Sequence[FrameFragment]:
+        return super().fragments
 
-    @property
-    def loglikelihood(self) -> float:
-        return self._loglik
+    def _create_fragment(
+        self, sequence: SequenceABC, path: FramePath, homologous: bool
+    ) -> FrameFragment:
+        return FrameFragment(sequence, path, homologous, self._decoder)
 
-    # def decode(self) -> CodonSearchResult:
-    #     fragments: List[CodonFragment] = []
-    #     intervals: List[Interval] = []
+    def decode(self) -> List[DecodedFragment]:
+        """
+        Decode every fragment into its most likely codons and amino acids.
 
-    #     start = end = 0
-    #     for i, frag in enumerate(self._fragments):
+        The whole path is decoded at once, without creating the fragments, and
+        split at the fragment boundaries afterwards.
+        """
+        if self._decoder is None:
+            raise ValueError("This result has no decoder.")
 
-    #         codon_frag = frag.decode()
-    #         end += len(codon_frag.sequence)
+        codons = self._decoder.decode_path(self._path, self._sequence.symbols)
+        create = self._decoder.create_fragment
+        bounds = self._bounds[:, 2:].tolist()
+        return [create(codons[i:j], bool(h)) for i, j, h in bounds]
 
-    #         fragments.append(codon_frag)
-    #         intervals.append(Interval(start, end))
 
-    #         start = end
+class StrandSearchResult(FrameSearchResult):
+    """
+    Search result of a sequence strand.
+
+    Parameters
+    ----------
+    strand : `str`
+        ``"+"`` for the sequence as given or ``"-"`` for its reverse complement.
+    result : `FrameSearchResult`
+        Result of searching the strand.
+    length : `int`
+        Sequence length.
+    """
+
+    def __init__(self, strand: str, result: FrameSearchResult, length: int):
+        loglik = result.loglikelihood
+        super().__init__(loglik, result.sequence, result.path, result._decoder)
+        self._strand = strand
+        self._result = result
+        self._length = length
+
+    @property
+    def strand(self) -> str:
+        return self._strand
 
-    #     return CodonSearchResult(self.score, fragments, intervals)
+    @property
+    def result(self) -> FrameSearchResult:
+        return self._result
+
+    @property
+    def fragments(self) -> Sequence[FrameFragment]:
+        """
+        Fragments of the strand, as read along it.
+        """
+        return super().fragments
+
+    @property
+    def intervals(self) -> Sequence[Interval]:
+        """
+        Fragment intervals, in forward strand coordinates.
+        """
+        if self._strand == "+":
+            return super().intervals
+        L = self._length
+        return [Interval(L - i.stop, L - i.start) for i in super().intervals]
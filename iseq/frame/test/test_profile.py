@@ -1,9 +1,12 @@
+from numpy import exp, unique, vstack
 from numpy.testing import assert_allclose, assert_equal
 
-from nmm import GeneticCode
+from nmm import GeneticCode, Path, Sequence
 
 from hmmer_reader import open_hmmer
-from iseq.frame import create_profile
+from iseq.cache import ProfileCache
+from iseq.frame import create_profile, create_profile_from_text
+from iseq.frame.profile import reverse_complement
 
 
 def test_frame_profile_frame1(PF03373):
@@ -208,3 +211,105 @@ def test_frame_profile_frame1(PF03373):
 #     assert_equal(str(citems[7][1]), "<M8,3>")
 #     assert_equal(aaitems[7][0], b"K")
 #     assert_equal(str(aaitems[7][1]), "<M8,1>")
+
+
+def test_frame_profile_tables(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    tables = hmmer.tables
+    nstates = 2 * tables["match"].shape[0] + 1
+    aa_lprobs = vstack([tables["null"], tables["match"], tables["insert"]])
+    ntables = len(unique(aa_lprobs, axis=0))
+    assert ntables < nstates
+    assert_equal(tables["codon"].shape, (ntables, 61))
+    assert_equal(tables["base"].shape, (ntables, 4))
+    assert_equal(tables["table"].shape, (nstates,))
+    assert_allclose(exp(tables["codon"]).sum(axis=1), 1.0)
+    assert_allclose(exp(tables["base"]).sum(axis=1), 1.0)
+
+
+def test_frame_profile_search_strands(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile(), epsilon=0.01)
+
+    rna = b"AAAAAACCUGGUAAAGAAGAUAAUAACAAAAAAAAA"
+    assert_equal(reverse_complement(reverse_complement(rna)), rna)
+    assert_equal(reverse_complement(b"ACGTN"), b"NACGT")
+
+    seq = Sequence(reverse_complement(rna), hmmer.alphabet)
+    plus, minus = hmmer.search_strands(seq)
+    assert_equal(plus.strand, "+")
+    assert_equal(minus.strand, "-")
+    assert minus.loglikelihood > plus.loglikelihood
+
+    result = hmmer.search(Sequence(rna, hmmer.alphabet))
+    assert_allclose(minus.loglikelihood, result.loglikelihood)
+
+    length = len(rna)
+    for i, j in zip(minus.intervals, result.intervals):
+        assert_equal((i.start, i.stop), (length - j.stop, length - j.start))
+
+
+def test_frame_profile_null_likelihood(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile(), epsilon=0.01)
+
+    for symbols in [b"A", b"CCUGGUAAAGAAGAUAAUAACAAA", b"ACGUUGCAAG"]:
+        seq = Sequence(symbols, hmmer.alphabet)
+        with hmmer._target_models(seq.length) as (null, _):
+            path = Path([(null.state, 1) for _ in range(seq.length)])
+            assert_allclose(null.likelihood(seq), null._hmm.likelihood(seq, path))
+
+
+def test_frame_profile_decode(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile(), epsilon=0.01)
+
+    core = b"CCUGGUAAAGAAGAUAAUAACAAA"
+    seq = Sequence(b"AAAAAA" + core + b"AAAAAAAAA", hmmer.alphabet)
+    result = hmmer.search(seq)
+    decoded = result.decode()
+    assert_equal(len(decoded), len(result.fragments))
+    assert_equal([d.homologous for d in decoded], result.homologous)
+
+    homologous = [d for d in decoded if d.homologous]
+    assert_equal(len(homologous), 1)
+    assert_equal(homologous[0].amino_acids, b"PGKEDNNK")
+    assert_equal(homologous[0].codons, core)
+
+    frags = [f for f in result.fragments if f.homologous]
+    assert_equal(frags[0].decode(), homologous[0])
+
+
+def test_frame_profile_cache(PF03373, tmp_path):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile(), epsilon=0.01)
+
+    seq = Sequence(b"CCUGGUAAAGAAGAUAAUAACAAA", hmmer.alphabet)
+    expected = hmmer.search(seq).loglikelihood
+
+    with open(PF03373, "r") as file:
+        text = file.read()
+
+    cache = ProfileCache(tmp_path / "cache")
+    for _ in range(2):
+        cached = create_profile_from_text(text, epsilon=0.01, cache=cache)
+        assert_allclose(cached.search(seq).loglikelihood, expected)
+    assert_equal(len(list(cache.directory.glob("*.npz"))), 1)
+
+    create_profile_from_text(text, epsilon=0.02, cache=cache)
+    assert_equal(len(list(cache.directory.glob("*.npz"))), 2)
+
+    # Entries that cannot be built from are rebuilt.
+    key = cache.key(text.encode(), kind="frame", epsilon=0.01)
+    tables = cache.load(key)
+    del tables["table"]
+    cache.save(key, tables)
+    cached = create_profile_from_text(text, epsilon=0.01, cache=cache)
+    assert_allclose(cached.search(seq).loglikelihood, expected)
+    assert "table" in cache.load(key)
+
+    with open(cache.directory / f"{key}.npz", "wb") as file:
+        file.write(b"truncated")
+    assert cache.load(key) is None
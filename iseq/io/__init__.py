@@ -1,3 +1,3 @@
-from ._tblout import tblout_reader
+from ._tblout import tblout_chunks, tblout_reader, tblout_table
 
-__all__ = ["tblout_reader"]
+__all__ = ["tblout_chunks", "tblout_reader", "tblout_table"]
@@ -1,4 +1,6 @@
-from typing import NamedTuple, Generator
+from typing import Dict, Generator, Iterator, List, NamedTuple
+
+from numpy import ndarray
 
 from ._misc import decomment
 
@@ -51,3 +53,83 @@ def tblout_reader(file) -> Generator[TBLRow, None, None]:
             inc=row[17],
             description=row[18],
         )
+
+
+TBL_FLOAT_COLUMNS = (
+    "full_e_value",
+    "full_score",
+    "full_bias",
+    "dom_e_value",
+    "dom_score",
+    "dom_bias",
+    "exp",
+)
+TBL_INT_COLUMNS = ("reg", "clu", "ov", "env", "dom", "rep", "inc")
+TBL_STR_COLUMNS = ("target_name", "target_accession", "query_name", "query_accession")
+
+
+def tblout_table(file) -> Dict[str, ndarray]:
+    """
+    Read a tblout file into a table of columns.
+
+    See `tblout_chunks` for the columns. It is the concatenation of every chunk.
+    """
+    from numpy import concatenate
+
+    chunks = list(tblout_chunks(file))
+    if len(chunks) == 0:
+        return _create_columns([])
+
+    return {k: concatenate([c[k] for c in chunks]) for k in chunks[0].keys()}
+
+
+def tblout_chunks(file, chunksize: int = 1 << 14) -> Iterator[Dict[str, ndarray]]:
+    """
+    Read a tblout file in tables of at most ``chunksize`` rows.
+
+    A table maps column names to arrays. E-values, scores, biases, and ``exp``
+    are parsed as floats: ``full_e_value``, ``full_score``, and ``full_bias`` for
+    the full sequence, and ``dom_e_value``, ``dom_score``, and ``dom_bias`` for
+    the best domain. ``reg``, ``clu``, ``ov``, ``env``, ``dom``, ``rep``, and
+    ``inc`` are parsed as integers. ``target_name``, ``target_accession``,
+    ``query_name``, ``query_accession``, and ``description`` are kept as arrays
+    of `str` objects, so that a long value does not widen every row of its
+    column.
+
+    Parameters
+    ----------
+    file
+        Text file object.
+    chunksize : `int`
+        Maximum number of rows per table.
+    """
+    from itertools import islice
+
+    rows = (row.split(None, 18) for row in decomment(file) if not row.isspace())
+    while True:
+        chunk = list(islice(rows, chunksize))
+        if len(chunk) == 0:
+            break
+        yield _create_columns(chunk)
+
+
+def _create_columns(rows: List[List[str]]) -> Dict[str, ndarray]:
+    from numpy import array
+
+    ncols = 19
+    cols = list(zip(*rows)) if len(rows) > 0 else [()] * ncols
+    names = TBL_STR_COLUMNS + TBL_FLOAT_COLUMNS + TBL_INT_COLUMNS
+
+    table: Dict[str, ndarray] = {}
+    for name, col in zip(names, cols):
+        if name in TBL_FLOAT_COLUMNS:
+            table[name] = array(col, dtype=float)
+        elif name in TBL_INT_COLUMNS:
+            table[name] = array(col, dtype=int)
+        else:
+            table[name] = array(col, dtype=object)
+
+    description = [r[18].rstrip("\n") if len(r) > 18 else "" for r in rows]
+    table["description"] = array(description, dtype=object)
+    return table
+
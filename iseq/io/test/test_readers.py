@@ -1,3 +1,7 @@
+from numpy.testing import assert_allclose, assert_equal
+
+from iseq.io import tblout_chunks, tblout_reader, tblout_table
+
 # from nmm import tblout_reader
 
 
@@ -14,3 +18,26 @@
 #         assert row.target_name == "item3"
 #         assert row.full_sequence.e_value == "1.2e-07"
 #         assert row.best_1_domain.e_value == "1.2e-07"
+
+
+def test_tblout_table(tblout):
+    with open(tblout) as file:
+        table = tblout_table(file)
+
+    assert_equal(table["target_name"], ["item2", "item3"])
+    assert_equal(table["query_accession"], ["PF03373.14", "PF03373.14"])
+    assert_allclose(table["full_e_value"], [1.2e-07, 1.2e-07])
+    assert_allclose(table["full_score"], [19.5, 19.5])
+    assert_allclose(table["dom_bias"], [3.5, 3.5])
+    assert_equal(table["inc"], [1, 1])
+    assert_equal(table["description"], ["-", "-"])
+    assert_equal(table["description"].dtype, object)
+
+    with open(tblout) as file:
+        rows = list(tblout_reader(file))
+    assert_equal(table["target_name"], [row.target_name for row in rows])
+
+    with open(tblout) as file:
+        chunks = list(tblout_chunks(file, 1))
+    assert_equal(len(chunks), 2)
+    assert_equal(chunks[1]["target_name"], ["item3"])
@@ -1,8 +1,21 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Sequence, Tuple
+from concurrent.futures import Executor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple, Type
 
-from nmm import HMM, LPROB_ZERO, CResults, CSequence, CState, MuteState, Path
+from nmm import (
+    HMM,
+    LPROB_ZERO,
+    CSequence,
+    CState,
+    Interval,
+    MuteState,
+    Path,
+    Sequence as NMMSequence,
+)
+from numpy import array, ndarray
+
+from .path import CompactPath, StateTable
 
 
 @dataclass
@@ -63,6 +76,10 @@ class Node(ABC):
     def D(self) -> CState:
         raise NotImplementedError()
 
+    @abstractmethod
+    def states(self) -> List[CState]:
+        raise NotImplementedError()
+
 
 class SpecialNode(ABC):
     @property
@@ -100,11 +117,20 @@ class SpecialNode(ABC):
     def T(self) -> MuteState:
         raise NotImplementedError()
 
+    @abstractmethod
+    def states(self) -> List[CState]:
+        raise NotImplementedError()
+
 
 class NullModel(ABC):
     def __init__(self, state: CState):
+        from numpy import full, nan
+
         self._hmm = HMM(state.alphabet)
         self._hmm.add_state(state, 0.0)
+        self._RR = LPROB_ZERO
+        # Emission log-probability of every byte, filled in as bytes are seen.
+        self._lprobs = full(256, nan)
 
     @property
     @abstractmethod
@@ -113,54 +139,202 @@ class NullModel(ABC):
 
     def set_transition(self, lprob: float):
         self._hmm.set_transition(self.state, self.state, lprob)
+        self._RR = lprob
+
+    def copy(self):
+        """
+        Copy of the model with an HMM of its own, sharing the state.
+        """
+        from copy import copy
+
+        model = copy(self)
+        model._hmm = HMM(self.state.alphabet)
+        model._hmm.add_state(self.state, 0.0)
+        model.set_transition(self._RR)
+        return model
 
     def likelihood(self, sequence: CSequence):
-        path = Path([(self.state, 1) for i in range(sequence.length)])
-        return self._hmm.likelihood(sequence, path)
+        """
+        Log-likelihood of a sequence emitted one symbol per step.
+
+        It is computed in closed form as the sum of the symbol emissions, looked
+        up by byte, plus ``(L - 1) * RR``, without building the path.
+        """
+        from numpy import bincount, dot, flatnonzero, frombuffer, isnan, uint8
+
+        L = sequence.length
+        if L == 0:
+            return self._hmm.likelihood(sequence, Path([]))
+
+        counts = bincount(frombuffer(sequence.symbols, dtype=uint8), minlength=256)
+        present = flatnonzero(counts)
+        for b in present[isnan(self._lprobs[present])]:
+            seq = NMMSequence(bytes([b]), self.state.alphabet)
+            self._lprobs[b] = self.state.lprob(seq)
+
+        lprob = float(dot(counts[present], self._lprobs[present]))
+        if L > 1:
+            lprob += (L - 1) * self._RR
+        return lprob
 
 
 class AltModel(ABC):
+    # Expected number of symbols emitted per core node.
+    _node_span: int = 1
+    # Type of the paths of the model.
+    _path_type: Type[CompactPath]
+
     def __init__(
         self,
         special_node: SpecialNode,
         core_nodes_trans: Sequence[Tuple[Node, Transitions]],
     ):
-        hmm = HMM(special_node.S.alphabet)
-        hmm.add_state(special_node.S, 0.0)
-        hmm.add_state(special_node.N)
-        hmm.add_state(special_node.B)
-        hmm.add_state(special_node.E)
-        hmm.add_state(special_node.J)
-        hmm.add_state(special_node.C)
-        hmm.add_state(special_node.T)
-
+        states = list(special_node.states())
+        for node, _ in core_nodes_trans:
+            states += node.states()
+        self._state_table = StateTable(states)
+        self._hmm = self._create_hmm()
         self._special_transitions = SpecialTransitions()
 
-        if len(core_nodes_trans) > 0:
-            node, trans = core_nodes_trans[0]
-            hmm.add_state(node.M)
-            hmm.add_state(node.I)
-            hmm.add_state(node.D)
-            prev = node
-
-            for node, trans in core_nodes_trans[1:]:
-                hmm.add_state(node.M)
-                hmm.add_state(node.I)
-                hmm.add_state(node.D)
-
-                hmm.set_transition(prev.M, node.M, trans.MM)
-                hmm.set_transition(prev.M, prev.I, trans.MI)
-                hmm.set_transition(prev.M, node.D, trans.MD)
-                hmm.set_transition(prev.I, node.M, trans.IM)
-                hmm.set_transition(prev.I, prev.I, trans.II)
-                hmm.set_transition(prev.D, node.M, trans.DM)
-                hmm.set_transition(prev.D, node.D, trans.DD)
-                prev = node
-
-        self._hmm = hmm
+        # Transitions set so far, kept to be replayed onto copies of the model:
+        # core and entry/exit transitions as arrays, the others one by one.
+        self._core_edges: Optional[List[Tuple[CState, CState]]] = None
+        self._core_trans: Optional[ndarray] = None
+        self._entry_exit: Optional[Tuple[ndarray, ndarray]] = None
+        self._transitions: Dict[Tuple[CState, CState], float] = {}
+
+        trans = [
+            [t.MM, t.MI, t.MD, t.IM, t.II, t.DM, t.DD] for _, t in core_nodes_trans
+        ]
+        self.set_core_transitions(array(trans, float).reshape((-1, 7)))
 
     def set_transition(self, a: CState, b: CState, lprob: float):
         self._hmm.set_transition(a, b, lprob)
+        self._transitions[(a, b)] = lprob
+
+    def set_core_transitions(self, trans: ndarray):
+        """
+        Set the transitions between core nodes, all at once.
+
+        Parameters
+        ----------
+        trans : `ndarray`
+            One row per core node, holding the transitions into it from the
+            previous node as ``(MM, MI, MD, IM, II, DM, DD)``. ``MI`` and ``II``
+            are the transitions into the insert state of the previous node. The
+            first row is ignored.
+        """
+        from numpy import arange, flatnonzero
+
+        if trans.shape != (self.length, 7):
+            raise ValueError("There must be one row of transitions per core node.")
+
+        edges = self._core_transition_edges()
+        lprobs = trans[1:].ravel()
+        if self._core_trans is None:
+            # Zero probability is the default of a new HMM.
+            index = flatnonzero(lprobs != LPROB_ZERO)
+        else:
+            index = arange(len(lprobs))
+
+        set_transition = self._hmm.set_transition
+        for i, lprob in zip(index.tolist(), lprobs[index].tolist()):
+            set_transition(*edges[i], lprob)
+        self._core_trans = trans
+
+    def set_entry_exit(self, entry: ndarray, exit: ndarray):
+        """
+        Set the local alignment entry and exit transitions, all at once.
+
+        Parameters
+        ----------
+        entry : `ndarray`
+            ``B`` to match state transition of every core node.
+        exit : `ndarray`
+            Match state to ``E`` transition of every core node, which is also the
+            delete state to ``E`` transition of every core node but the first.
+        """
+        B = self.special_node.B
+        E = self.special_node.E
+        set_transition = self._hmm.set_transition
+        nodes = self.core_nodes()
+        for node, lprob in zip(nodes, entry.tolist()):
+            set_transition(B, node.M, lprob)
+
+        for i, (node, lprob) in enumerate(zip(nodes, exit.tolist())):
+            set_transition(node.M, E, lprob)
+            if i > 0:
+                set_transition(node.D, E, lprob)
+        self._entry_exit = (entry, exit)
+
+    def _transition_lprobs(self) -> Dict[Tuple[CState, CState], float]:
+        """
+        Every transition set so far, by pair of states.
+        """
+        trans: Dict[Tuple[CState, CState], float] = {}
+        if self._core_trans is not None:
+            lprobs = self._core_trans[1:].ravel().tolist()
+            trans.update(zip(self._core_transition_edges(), lprobs))
+
+        if self._entry_exit is not None:
+            B = self.special_node.B
+            E = self.special_node.E
+            entry, exit = self._entry_exit
+            for i, (node, bm, me) in enumerate(
+                zip(self.core_nodes(), entry.tolist(), exit.tolist())
+            ):
+                trans[(B, node.M)] = bm
+                trans[(node.M, E)] = me
+                if i > 0:
+                    trans[(node.D, E)] = me
+
+        trans.update(self._transitions)
+        return trans
+
+    def _core_transition_edges(self) -> List[Tuple[CState, CState]]:
+        """
+        State pairs of the core transitions, in the order of the rows after the
+        first one of `set_core_transitions`. They are shared by copies.
+        """
+        if self._core_edges is None:
+            nodes = self.core_nodes()
+            edges: List[Tuple[CState, CState]] = []
+            for p, n in zip(nodes, nodes[1:]):
+                edges += [(p.M, n.M), (p.M, p.I), (p.M, n.D), (p.I, n.M)]
+                edges += [(p.I, p.I), (p.D, n.M), (p.D, n.D)]
+            self._core_edges = edges
+        return self._core_edges
+
+    def copy(self):
+        """
+        Copy of the model with an HMM of its own, sharing the states.
+
+        Every transition set so far is set again on the new HMM, so that the
+        copy scores as the model does, and either one can then be changed
+        without affecting the other.
+        """
+        from copy import copy
+
+        model = copy(self)
+        model._hmm = self._create_hmm()
+        model._special_transitions = replace(self._special_transitions)
+        model._core_trans = None
+        if self._core_trans is not None:
+            model.set_core_transitions(self._core_trans)
+        if self._entry_exit is not None:
+            model.set_entry_exit(*self._entry_exit)
+        model._transitions = {}
+        for (a, b), lprob in self._transitions.items():
+            model.set_transition(a, b, lprob)
+        return model
+
+    def _create_hmm(self) -> HMM:
+        table = self._state_table
+        hmm = HMM(table[0].alphabet)
+        hmm.add_state(table[0], 0.0)
+        for i in range(1, len(table)):
+            hmm.add_state(table[i])
+        return hmm
 
     @abstractmethod
     def core_nodes(self) -> Sequence[Node]:
@@ -180,5 +354,264 @@ class AltModel(ABC):
     def length(self) -> int:
         raise NotImplementedError()
 
-    def viterbi(self, seq: CSequence, window_length: int = 0) -> CResults:
-        return self._hmm.viterbi(seq, self.special_node.T, window_length)
+    @property
+    def node_span(self) -> int:
+        """
+        Expected number of symbols emitted per core node.
+        """
+        return self._node_span
+
+    def window_overlap(self) -> int:
+        """
+        Overlap between consecutive windows of a windowed scan.
+
+        It is twice the span of a hit that goes through every core node and
+        inserts as many symbols as it matches, so that such a hit always lies
+        whole within a single window.
+        """
+        return 4 * self._node_span * self.length
+
+    @property
+    def state_table(self) -> StateTable:
+        """
+        Table of the model states, which the paths of the model refer to.
+        """
+        return self._state_table
+
+    def create_path(self, state_ids: ndarray, seq_lens: ndarray) -> CompactPath:
+        return self._path_type(self._state_table, state_ids, seq_lens)
+
+    def _viterbi(
+        self,
+        seq: CSequence,
+        window_length: int,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[float, CompactPath]:
+        if window_length == 0 or seq.length <= window_length:
+            score, state_ids, seq_lens = self._window_viterbi(seq)
+            return (score, self.create_path(state_ids, seq_lens))
+
+        from warnings import warn
+
+        from ._window import create_windows, stitch_windows
+
+        overlap = self.window_overlap()
+        if window_length < 2 * overlap:
+            msg = f"`window_length` must be at least twice the overlap ({overlap})."
+            raise ValueError(msg)
+
+        windows = create_windows(seq.length, window_length, overlap)
+
+        def scan(window: Interval) -> Tuple[ndarray, ndarray]:
+            return self._window_viterbi(seq.slice(window))[1:]
+
+        if executor is not None and len(windows) > 1:
+            pieces = list(executor.map(scan, windows))
+        else:
+            pieces = [scan(w) for w in windows]
+        kinds = self._state_table.kinds
+        merged = stitch_windows(windows, pieces, kinds, self._labels())
+
+        if merged is None:
+            msg = (
+                "Window paths could not be stitched together, so the sequence has "
+                "been scanned whole. A larger `window_length` avoids it."
+            )
+            warn(msg, RuntimeWarning)
+            score, state_ids, seq_lens = self._window_viterbi(seq)
+            return (score, self.create_path(state_ids, seq_lens))
+
+        path = self.create_path(*self._drop_forced_hits(seq, *merged))
+        return (self._hmm.likelihood(seq, path), path)
+
+    def _labels(self) -> Tuple[int, int, int]:
+        """
+        State ids of the N, J, and C states.
+        """
+        node = self.special_node
+        index = self._state_table.index
+        return (index(node.N), index(node.J), index(node.C))
+
+    def _drop_forced_hits(
+        self, seq: CSequence, state_ids: ndarray, seq_lens: ndarray
+    ) -> Tuple[ndarray, ndarray]:
+        """
+        Drop the hits of a stitched path that do not raise its score.
+
+        A window can only be scanned through at least one hit, so a window
+        without any homology still yields one, which a scan of the whole sequence
+        would have left out. A hit is dropped when emitting its symbols with the
+        surrounding N, J, or C state instead, in steps of `node_span` symbols,
+        scores at least as high. Hits are dropped worst first, and at least one
+        is kept, as in any path of the model.
+        """
+        from numpy import concatenate, cumsum, flatnonzero, full
+
+        from ._window import relabel
+
+        table = self._state_table
+        step_kinds = table.kinds[state_ids]
+        begins = flatnonzero(step_kinds == ord(b"B")).tolist()
+        ends = flatnonzero(step_kinds == ord(b"E")).tolist()
+        if len(begins) < 2:
+            return (state_ids, seq_lens)
+
+        node = self.special_node
+        symbols = seq.symbols
+        alphabet = node.S.alphabet
+        span = self._node_span
+        trans = self._transition_lprobs()
+        ids = state_ids.tolist()
+        lens = seq_lens.tolist()
+        starts = (cumsum(seq_lens) - seq_lens).tolist()
+
+        def lprob(state: CState, start: int, length: int) -> float:
+            subseq = NMMSequence(symbols[start : start + length], alphabet)
+            return state.lprob(subseq)
+
+        def chain(blocks: List[Tuple[CState, int]]) -> float:
+            # Transitions along runs of steps of a same state.
+            blocks = [(state, count) for state, count in blocks if count > 0]
+            score = 0.0
+            for (a, _), (b, _) in zip(blocks, blocks[1:]):
+                score += trans.get((a, b), LPROB_ZERO)
+            for a, count in blocks:
+                if count > 1:
+                    score += (count - 1) * trans.get((a, a), LPROB_ZERO)
+            return score
+
+        # Score of every hit on its own, and of its symbols emitted by J instead.
+        hit_scores: List[float] = []
+        chunks: List[List[int]] = []
+        background: List[float] = []
+        for b, e in zip(begins, ends):
+            score = 0.0
+            for k in range(b, e + 1):
+                if k < e:
+                    score += trans.get((table[ids[k]], table[ids[k + 1]]), LPROB_ZERO)
+                if lens[k] > 0:
+                    score += lprob(table[ids[k]], starts[k], lens[k])
+            hit_scores.append(score)
+
+            size = starts[e] - starts[b]
+            sizes = [span] * (size // span) + ([size % span] if size % span else [])
+            offsets = cumsum([0] + sizes).tolist()
+            chunks.append(sizes)
+            background.append(
+                sum(lprob(node.J, starts[b] + o, n) for o, n in zip(offsets, sizes))
+            )
+
+        # Number of non-homologous steps before every hit, and after the last one.
+        gaps = [b - e - 1 for b, e in zip(begins, [0] + ends)]
+        gaps.append(len(ids) - 1 - ends[-1] - 1)
+        hits = list(range(len(begins)))
+
+        def gain(k: int) -> float:
+            h = hits[k]
+            first = k == 0
+            last = k == len(hits) - 1
+            before = node.N if first else node.J
+            after = node.C if last else node.J
+            P = node.S if first else node.E
+            Z = node.T if last else node.B
+
+            score = chain([(P, 1), (before, gaps[k]), (node.B, 1)])
+            score += hit_scores[h]
+            score += chain([(node.E, 1), (after, gaps[k + 1]), (Z, 1)])
+
+            X = node.N if first else (node.C if last else node.J)
+            n = gaps[k] + len(chunks[h]) + gaps[k + 1]
+            return score - (chain([(P, 1), (X, n), (Z, 1)]) + background[h])
+
+        gains = [gain(k) for k in range(len(hits))]
+        while len(hits) > 1:
+            k = min(range(len(hits)), key=gains.__getitem__)
+            if gains[k] > 0:
+                break
+            gaps[k] += len(chunks[hits[k]]) + gaps.pop(k + 1)
+            del hits[k]
+            del gains[k]
+            for i in (k - 1, k):
+                if 0 <= i < len(hits):
+                    gains[i] = gain(i)
+
+        if len(hits) == len(begins):
+            return (state_ids, seq_lens)
+
+        kept = set(hits)
+        J = table.index(node.J)
+        new_ids: List[ndarray] = []
+        new_lens: List[ndarray] = []
+        start = 0
+        for h, (b, e) in enumerate(zip(begins, ends)):
+            if h in kept:
+                continue
+            new_ids += [state_ids[start:b], full(len(chunks[h]), J, state_ids.dtype)]
+            new_lens += [seq_lens[start:b], array(chunks[h], seq_lens.dtype)]
+            start = e + 1
+        new_ids.append(state_ids[start:])
+        new_lens.append(seq_lens[start:])
+
+        merged = relabel(
+            concatenate(new_ids), concatenate(new_lens), table.kinds, self._labels()
+        )
+        assert merged is not None
+        return merged
+
+    def viterbi_score(
+        self,
+        seq: CSequence,
+        window_length: int = 0,
+        executor: Optional[Executor] = None,
+    ) -> float:
+        """
+        Viterbi score of the sequence, without laying its path out.
+        """
+        if window_length == 0 or seq.length <= window_length:
+            results = self._hmm.viterbi(seq, self.special_node.T, 0)
+            assert len(results) == 1
+            return results[0].loglikelihood
+
+        return self._viterbi(seq, window_length, executor)[0]
+
+    def _viterbi_above(
+        self,
+        seq: CSequence,
+        min_score: float,
+        window_length: int = 0,
+        executor: Optional[Executor] = None,
+    ) -> Optional[Tuple[float, CompactPath]]:
+        """
+        Viterbi score and path of the sequence if it scores at least ``min_score``.
+
+        The dynamic programming is run once, and the path is only laid out for
+        sequences scoring high enough when the sequence is scanned whole.
+        """
+        if window_length == 0 or seq.length <= window_length:
+            results = self._hmm.viterbi(seq, self.special_node.T, 0)
+            assert len(results) == 1
+            if results[0].loglikelihood < min_score:
+                return None
+            score, state_ids, seq_lens = self._layout(results[0])
+            return (score, self.create_path(state_ids, seq_lens))
+
+        score, path = self._viterbi(seq, window_length, executor)
+        if score < min_score:
+            return None
+        return (score, path)
+
+    def _window_viterbi(self, seq: CSequence) -> Tuple[float, ndarray, ndarray]:
+        """
+        Viterbi score and path of the sequence, as state ids and emission lengths.
+        """
+        results = self._hmm.viterbi(seq, self.special_node.T, 0)
+        assert len(results) == 1
+        return self._layout(results[0])
+
+    def _layout(self, result) -> Tuple[float, ndarray, ndarray]:
+        from numpy import intp
+
+        index = self._state_table.index_imm
+        pairs = [(index(step.state.imm_state), step.seq_len) for step in result.path]
+        steps = array(pairs, intp).reshape((-1, 2))
+        return (result.loglikelihood, steps[:, 0].copy(), steps[:, 1].copy())
@@ -0,0 +1,127 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from nmm import CData, CPath, CState, CStep, create_imm_path
+from numpy import ndarray
+
+__all__ = ["CompactPath", "StateTable"]
+
+
+class StateTable:
+    """
+    Table of the states of a model, giving every state an integer id.
+
+    Parameters
+    ----------
+    states : `Sequence[CState]`
+        States, in id order.
+    """
+
+    def __init__(self, states: Sequence[CState]):
+        from numpy import fromiter, uint8
+
+        self._states = list(states)
+        self._ids: Dict[CData, int] = {}
+        for i, state in enumerate(self._states):
+            self._ids[state.imm_state] = i
+
+        names = (state.name[0] if len(state.name) > 0 else 0 for state in states)
+        self._kinds = fromiter(names, dtype=uint8, count=len(self._states))
+
+    @property
+    def kinds(self) -> ndarray:
+        """
+        First byte of the name of every state.
+        """
+        return self._kinds
+
+    def index(self, state: CState) -> int:
+        return self._ids[state.imm_state]
+
+    def index_imm(self, imm_state: CData) -> int:
+        return self._ids[imm_state]
+
+    def __getitem__(self, i: int) -> CState:
+        return self._states[i]
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class CompactPath(ABC):
+    """
+    Path laid out as two integer arrays: state ids and emission lengths.
+
+    Step objects are created only when the path is indexed or iterated, and the
+    underlying imm path only when `imm_path` is accessed, as it is to compute the
+    likelihood of the path. Slicing a path gives a view over the same arrays.
+
+    Parameters
+    ----------
+    table : `StateTable`
+        Table the state ids refer to, usually held by the model.
+    state_ids : `ndarray`
+        State id of every step.
+    seq_lens : `ndarray`
+        Emission length of every step.
+    """
+
+    def __init__(self, table: StateTable, state_ids: ndarray, seq_lens: ndarray):
+        self._table = table
+        self._state_ids = state_ids
+        self._seq_lens = seq_lens
+        self._cpath: Optional[CPath] = None
+
+    @property
+    def table(self) -> StateTable:
+        return self._table
+
+    @property
+    def state_ids(self) -> ndarray:
+        return self._state_ids
+
+    @property
+    def seq_lens(self) -> ndarray:
+        return self._seq_lens
+
+    @property
+    def kinds(self) -> ndarray:
+        """
+        First byte of the state name of every step.
+        """
+        return self._table.kinds[self._state_ids]
+
+    @property
+    def imm_path(self) -> CData:
+        if self._cpath is None:
+            steps = list(self)
+            self._cpath = CPath(create_imm_path(steps), steps)
+        return self._cpath.imm_path
+
+    def steps(self) -> List[Tuple[CState, int]]:
+        table = self._table
+        lens = self._seq_lens.tolist()
+        return [(table[i], n) for i, n in zip(self._state_ids.tolist(), lens)]
+
+    def __len__(self) -> int:
+        return len(self._state_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return type(self)(self._table, self._state_ids[i], self._seq_lens[i])
+        state = self._table[self._state_ids[i]]
+        return self._create_step(state, int(self._seq_lens[i]))
+
+    def __iter__(self) -> Iterator[CStep]:
+        for state, seq_len in self.steps():
+            yield self._create_step(state, seq_len)
+
+    @abstractmethod
+    def _create_step(self, state: CState, seq_len: int) -> CStep:
+        raise NotImplementedError()
+
+    def __str__(self) -> str:
+        return "".join(str(step) for step in self)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}:{str(self)}>"
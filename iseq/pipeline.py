@@ -0,0 +1,627 @@
+from collections import deque
+from itertools import islice
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from nmm import Interval, Sequence as NMMSequence
+from numpy import where
+
+from ._gff import GFFItem, GFFWriter, open_gff
+from .fasta import FastaWriter
+from .profile import Profile
+from .result import SearchResult
+
+if TYPE_CHECKING:
+    from .calibration import Calibration
+    from .frame import DecodedFragment
+
+__all__ = [
+    "Hit",
+    "Target",
+    "create_candidates",
+    "read_candidates",
+    "read_targets",
+    "scan",
+    "scan_candidates",
+    "scan_file",
+    "write_gff",
+]
+
+_DNA_TO_RNA = bytes.maketrans(b"T", b"U")
+
+Target = NamedTuple(
+    "Target", [("defline", str), ("sequence", Union[str, memoryview])]
+)
+
+Hit = NamedTuple(
+    "Hit",
+    [
+        ("target", Target),
+        ("accession", str),
+        ("profile", Profile),
+        ("result", SearchResult),
+        ("evalue", Optional[float]),
+    ],
+)
+
+
+def read_targets(file, mapped: bool = False) -> Iterator[Target]:
+    """
+    Stream the records of a FASTA file, one at a time.
+
+    If ``mapped`` is ``True``, the file is read through `iseq.fasta.MappedFasta`
+    and the sequences of the targets are views of the memory map instead of
+    strings.
+    """
+    if mapped:
+        from .fasta import MappedFasta
+
+        fasta = MappedFasta(file)
+        try:
+            yield from fasta.targets()
+        finally:
+            fasta.close()
+        return
+
+    from fasta_reader import open_fasta
+
+    with open_fasta(file) as fasta:
+        for item in fasta:
+            yield Target(item.defline, item.sequence)
+
+
+def scan(
+    targets: Iterable[Target],
+    profiles: Sequence[Tuple[str, Profile]],
+    window: int = 1024,
+    workers: int = 1,
+    threshold: Optional[float] = None,
+    both_strands: bool = False,
+    calibrations: Optional[Mapping[str, "Calibration"]] = None,
+    nsequences: Optional[int] = None,
+    max_evalue: Optional[float] = None,
+) -> Iterator[Hit]:
+    """
+    Search a stream of targets against one or more profiles.
+
+    Targets are consumed ``window`` at a time, and every target of a window is
+    searched against every profile before the next window is read, so that at
+    most ``window`` targets and their results are held in memory. Hits are
+    yielded in target order, and in profile order for a same target.
+
+    Targets longer than the `Profile.window_length` of a profile are searched
+    against it one window at a time, each window as a sequence of its own, and
+    give a hit per window holding homologous fragments. Only a window of such a
+    target is copied at a time, so that memory does not grow with the length of
+    the records of a mapped FASTA file.
+
+    Parameters
+    ----------
+    targets : `Iterable[Target]`
+        Targets to be searched, such as the records given by `read_targets`.
+    profiles : `Sequence[Tuple[str, Profile]]`
+        Pairs of profile accession and profile.
+    window : `int`
+        Number of targets in flight.
+    workers : `int`
+        Number of worker processes, as in `Profile.search_many`.
+    threshold : `Optional[float]`
+        Minimum score of a target to be searched in full, as in
+        `Profile.search_many`. Targets below it, or rejected by the prefilter of
+        the profile, give no hit.
+    both_strands : `bool`
+        If ``True``, targets are also searched on their reverse strand against
+        frame profiles, as in `iseq.frame.FrameProfile.search_strands`, and
+        the hits of the ``"+"`` strand come before those of the ``"-"`` strand.
+    calibrations : `Optional[Mapping[str, Calibration]]`
+        Score distributions by profile accession, as given by
+        `iseq.calibration.calibrate`. Hits of a calibrated profile carry the
+        E-value of their score; the others have ``None``.
+    nsequences : `Optional[int]`
+        Number of sequences the E-values refer to, usually the size of the
+        target database. Required with ``calibrations``.
+    max_evalue : `Optional[float]`
+        Maximum E-value of a hit. It is turned into a minimum score for every
+        calibrated profile, which prunes targets as ``threshold`` does.
+    """
+    if window < 1:
+        raise ValueError("`window` must be positive.")
+    evalues = _EValues(calibrations, nsequences, max_evalue, threshold)
+
+    from ._executor import SearchPool
+
+    chunksize = _chunksize(window, workers)
+    pool = SearchPool({i: profile for i, (_, profile) in enumerate(profiles)}, workers)
+    with pool:
+        for batch in _batches(targets, window):
+            symbols: Dict[Tuple[int, bool], bytes] = {}
+            results: List[List[List[SearchResult]]] = []
+            for key, (acc, profile) in enumerate(profiles):
+                pieces = _pieces(batch, profile, symbols)
+                cutoff = evalues.threshold(acc)
+                search = (pool, key, profile, chunksize, cutoff, both_strands)
+                results.append(_search_batch(pieces, len(batch), *search))
+
+            for i, target in enumerate(batch):
+                for (acc, profile), profile_results in zip(profiles, results):
+                    for result in profile_results[i]:
+                        evalue = evalues.evalue(acc, result)
+                        yield Hit(target, acc, profile, result, evalue)
+
+
+def read_candidates(file) -> Dict[str, List[str]]:
+    """
+    Read the (target, query) pairs listed in a HMMER tblout file.
+
+    Queries are identified by their accession, or by their name if they have
+    none. See `create_candidates`.
+    """
+    from .io import tblout_chunks
+
+    candidates: Dict[str, List[str]] = {}
+    with open(file, "r") as fp:
+        for table in tblout_chunks(fp):
+            acc = table["query_accession"]
+            queries = where(acc == "-", table["query_name"], acc)
+            _add_candidates(candidates, zip(table["target_name"], queries))
+    return candidates
+
+
+def create_candidates(pairs: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """
+    Map every target name to the queries it is listed with, in order.
+
+    Parameters
+    ----------
+    pairs : `Iterable[Tuple[str, str]]`
+        Pairs of target name and query, such as
+        ``(row.target_name, row.query_accession)`` for the rows given by
+        `iseq.io.tblout_reader`.
+    """
+    candidates: Dict[str, List[str]] = {}
+    _add_candidates(candidates, pairs)
+    return candidates
+
+
+def scan_candidates(
+    fasta,
+    profiles: Mapping[str, Profile],
+    candidates: Mapping[str, Sequence[str]],
+    window: int = 1024,
+    workers: int = 1,
+    threshold: Optional[float] = None,
+    both_strands: bool = False,
+    calibrations: Optional[Mapping[str, "Calibration"]] = None,
+    nsequences: Optional[int] = None,
+    max_evalue: Optional[float] = None,
+) -> Iterator[Hit]:
+    """
+    Search the targets against the profiles they are listed with only.
+
+    Candidates are grouped by query, and each profile is fetched from
+    ``profiles`` once, when its own targets are searched. Those are looked up by
+    name in the memory-mapped FASTA file, so that only the listed sequences are
+    read, ``window`` at a time, and a lazily loaded mapping, such as a
+    `iseq.database.ProfileDatabase`, holds a single profile of the scan at a
+    time. Worker processes are started once and fetch the profiles they search
+    from their own copy of ``profiles``. Hits are yielded by query, in the order
+    queries are first listed in ``candidates``, and in candidate order for a same
+    query. Listed targets missing from the FASTA file are skipped.
+
+    Parameters
+    ----------
+    fasta : `Union[str, Path, MappedFasta]`
+        FASTA file of the targets, or its `iseq.fasta.MappedFasta`.
+    profiles : `Mapping[str, Profile]`
+        Profiles by query, such as a `iseq.database.ProfileDatabase`.
+    candidates : `Mapping[str, Sequence[str]]`
+        Queries of each target name, as given by `read_candidates`.
+    window : `int`
+        Number of targets in flight.
+    workers : `int`
+        Number of worker processes, as in `Profile.search_many`.
+    threshold : `Optional[float]`
+        Minimum score of a target to be searched in full, as in
+        `Profile.search_many`.
+    both_strands : `bool`
+        Whether to search the reverse strand too, as in `scan`.
+    calibrations : `Optional[Mapping[str, Calibration]]`
+        Score distributions by query, as in `scan`.
+    nsequences : `Optional[int]`
+        Number of sequences the E-values refer to, as in `scan`.
+    max_evalue : `Optional[float]`
+        Maximum E-value of a hit, as in `scan`.
+    """
+    if window < 1:
+        raise ValueError("`window` must be positive.")
+    evalues = _EValues(calibrations, nsequences, max_evalue, threshold)
+
+    from contextlib import ExitStack
+
+    from ._executor import SearchPool
+    from .fasta import MappedFasta
+
+    targets: Dict[str, List[str]] = {}
+    for target, queries in candidates.items():
+        for query in queries:
+            targets.setdefault(query, []).append(target)
+
+    chunksize = _chunksize(window, workers)
+    with ExitStack() as stack:
+        if not isinstance(fasta, MappedFasta):
+            fasta = stack.enter_context(MappedFasta(fasta))
+        pool = stack.enter_context(SearchPool(profiles, workers))
+
+        for query, names in targets.items():
+            listed = [fasta.target(name) for name in names if name in fasta]
+            if len(listed) == 0:
+                continue
+
+            profile = profiles[query]
+            cutoff = evalues.threshold(query)
+            search = (pool, query, profile, chunksize, cutoff, both_strands)
+            for batch in _batches(listed, window):
+                pieces = _pieces(batch, profile, {})
+                found = _search_batch(pieces, len(batch), *search)
+                for target, results in zip(batch, found):
+                    for result in results:
+                        evalue = evalues.evalue(query, result)
+                        yield Hit(target, query, profile, result, evalue)
+
+
+def write_gff(hits: Iterable[Hit], fp: IO[str]) -> int:
+    """
+    Write the homologous fragments of a stream of hits as GFF3 features.
+
+    Features are written in blocks as the hits are produced. Returns the number
+    of features written.
+    """
+    gff = GFFWriter(fp)
+    nitems = _write_items(hits, gff)
+    gff.flush()
+    return nitems
+
+
+def scan_file(
+    fasta,
+    profiles: Sequence[Tuple[str, Profile]],
+    output,
+    window: int = 1024,
+    workers: int = 1,
+    threshold: Optional[float] = None,
+    compression: Optional[str] = None,
+    index: bool = False,
+    mapped: bool = False,
+    amino=None,
+    codon=None,
+    both_strands: bool = False,
+    calibrations: Optional[Mapping[str, "Calibration"]] = None,
+    nsequences: Optional[int] = None,
+    max_evalue: Optional[float] = None,
+) -> int:
+    """
+    Search the records of a FASTA file and write the hits to a GFF3 file.
+
+    It chains `read_targets`, `scan`, and `write_gff`, and returns the number of
+    features written. ``compression`` and ``index`` are passed to `open_gff`,
+    ``mapped`` to `read_targets`, and ``both_strands``, ``calibrations``,
+    ``nsequences``, and ``max_evalue`` to `scan`. Features of calibrated profiles
+    have an ``E-value`` attribute.
+
+    For frame profiles, the homologous fragments can also be decoded, and their
+    amino acids and codons streamed to the FASTA files ``amino`` and ``codon``.
+    Records are named after the ``ID`` of their GFF3 feature.
+    """
+    from contextlib import ExitStack
+
+    targets = read_targets(fasta, mapped)
+    hits = scan(
+        targets,
+        profiles,
+        window,
+        workers,
+        threshold,
+        both_strands,
+        calibrations,
+        nsequences,
+        max_evalue,
+    )
+    with ExitStack() as stack:
+        gff = stack.enter_context(open_gff(output, compression, index))
+        writers: List[Optional[FastaWriter]] = []
+        for file in [amino, codon]:
+            if file is None:
+                writers.append(None)
+                continue
+            fp = stack.enter_context(open(file, "w"))
+            writers.append(stack.enter_context(FastaWriter(fp)))
+        return _write_items(hits, gff, *writers)
+
+
+def _write_items(
+    hits: Iterable[Hit],
+    gff: GFFWriter,
+    amino: Optional[FastaWriter] = None,
+    codon: Optional[FastaWriter] = None,
+) -> int:
+    decode = amino is not None or codon is not None
+    nitems = 0
+    for hit in hits:
+        seqid = _seqid(hit.target)
+        strand = getattr(hit.result, "strand", "+")
+        epsilon = getattr(hit.profile, "epsilon", None)
+
+        decoded: List[Optional["DecodedFragment"]]
+        if decode:
+            if not hasattr(hit.result, "decode"):
+                raise ValueError("Only frame profile results can be decoded.")
+            decoded = list(hit.result.decode())
+        else:
+            decoded = [None] * len(hit.result.intervals)
+
+        frags = zip(hit.result.intervals, hit.result.homologous, decoded)
+        for interval, homologous, fragment in frags:
+            if not homologous:
+                continue
+
+            nitems += 1
+            att = f"ID=item{nitems};Profile={hit.accession}"
+            if epsilon is not None:
+                att += f";Epsilon={epsilon}"
+            if hit.evalue is not None:
+                att += f";E-value={hit.evalue:.3g}"
+
+            start = interval.start + 1
+            stop = interval.stop
+            item = GFFItem(seqid, "nmm", ".", start, stop, 0.0, strand, ".", att)
+            gff.append(item)
+
+            if fragment is not None:
+                if amino is not None:
+                    amino.append(f"item{nitems}", fragment.amino_acids)
+                if codon is not None:
+                    codon.append(f"item{nitems}", fragment.codons)
+
+    return nitems
+
+
+def _search_batch(
+    pieces: Iterable["_Piece"],
+    ntargets: int,
+    pool,
+    key,
+    profile: Profile,
+    chunksize: int,
+    threshold: Optional[float],
+    both_strands: bool,
+) -> List[List[SearchResult]]:
+    """
+    Results of every target of a batch, searched on one or both strands.
+
+    Pieces are turned into sequences as the workers ask for them, so that only
+    those in flight are held in memory.
+    """
+    alphabet = profile.alphabet
+    strands = both_strands and hasattr(profile, "search_strands")
+    if strands:
+        from .frame.profile import reverse_complement
+        from .frame.result import StrandSearchResult
+
+    pending: Deque[_Piece] = deque()
+
+    def sequences() -> Iterator[NMMSequence]:
+        for piece in pieces:
+            pending.append(piece)
+            yield NMMSequence(piece.symbols, alphabet)
+            if strands:
+                yield NMMSequence(reverse_complement(piece.symbols), alphabet)
+
+    found = iter(pool.search_many(key, sequences(), chunksize, True, threshold))
+    results: List[List[SearchResult]] = [[] for _ in range(ntargets)]
+    for first in found:
+        piece = pending.popleft()
+        pair = [("+", first), ("-", next(found))] if strands else [("", first)]
+        for strand, result in pair:
+            if result is None:
+                continue
+            if strand != "":
+                result = StrandSearchResult(strand, result, len(piece.symbols))
+            if piece.own is not None:
+                result = _WindowResult(result, piece.offset, piece.own)
+                if len(result.intervals) == 0:
+                    continue
+            results[piece.target].append(result)
+    return results
+
+
+class _Piece(NamedTuple):
+    """
+    Part of a target to be searched on its own.
+
+    ``own`` is the interval of the target whose hits are taken from this piece,
+    or ``None`` if the piece is the whole target.
+    """
+
+    target: int
+    offset: int
+    own: Optional[Interval]
+    symbols: bytes
+
+
+def _pieces(
+    batch: Sequence[Target],
+    profile: Profile,
+    symbols: Dict[Tuple[int, bool], bytes],
+) -> Iterator[_Piece]:
+    """
+    Pieces of the targets of a batch, as searched by a profile.
+
+    Targets longer than `Profile.window_length` are cut into windows, as given by
+    `AltModel.window_overlap`, and only the symbols of one window are copied at a
+    time. Consecutive windows overlap by twice the span of the longest hit, so
+    that each hit lies whole in the window its start is owned by, the owned
+    intervals being cut at the middle of the overlaps. Other targets are copied
+    whole, once per batch, and shared by the profiles of a same kind of alphabet
+    through ``symbols``. Targets are written with T for DNA, which becomes U for
+    profiles of an RNA alphabet.
+    """
+    from ._window import create_windows
+
+    alphabet = profile.alphabet.symbols
+    rna = b"T" not in alphabet and b"U" in alphabet
+    window_length = profile.window_length
+
+    for i, target in enumerate(batch):
+        length = len(target.sequence)
+        if window_length == 0 or length <= window_length:
+            if (i, rna) not in symbols:
+                symbols[(i, rna)] = _symbols(target.sequence, rna)
+            yield _Piece(i, 0, None, symbols[(i, rna)])
+            continue
+
+        overlap = profile.alt_model.window_overlap()
+        if window_length < 2 * overlap:
+            msg = f"`window_length` must be at least twice the overlap ({overlap})."
+            raise ValueError(msg)
+
+        windows = create_windows(length, window_length, overlap)
+        cuts = [(w.stop + v.start) // 2 for w, v in zip(windows, windows[1:])]
+        for w, start, stop in zip(windows, [0] + cuts, cuts + [length]):
+            view = target.sequence[w.start : w.stop]
+            yield _Piece(i, w.start, Interval(start, stop), _symbols(view, rna))
+
+
+class _WindowResult:
+    """
+    Result of a window of a target, in target coordinates.
+
+    Only the homologous fragments starting within the interval owned by the
+    window are kept. Anything else is taken from the result of the window.
+    """
+
+    def __init__(self, result: SearchResult, offset: int, own: Interval):
+        self._result = result
+        self._offset = offset
+        self._kept = [
+            k
+            for k, (i, h) in enumerate(zip(result.intervals, result.homologous))
+            if h and own.start <= offset + i.start < own.stop
+        ]
+
+    @property
+    def intervals(self) -> List[Interval]:
+        off = self._offset
+        intervals = self._result.intervals
+        return [
+            Interval(off + intervals[k].start, off + intervals[k].stop)
+            for k in self._kept
+        ]
+
+    @property
+    def homologous(self) -> List[bool]:
+        return [True] * len(self._kept)
+
+    @property
+    def fragments(self) -> List[Any]:
+        fragments = self._result.fragments
+        return [fragments[k] for k in self._kept]
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._result, name)
+        if name != "decode":
+            return attr
+
+        def decode():
+            decoded = list(attr())
+            return [decoded[k] for k in self._kept]
+
+        return decode
+
+
+class _EValues:
+    """
+    E-values of the hits and score thresholds of the profiles of a scan.
+    """
+
+    def __init__(
+        self,
+        calibrations: Optional[Mapping[str, "Calibration"]],
+        nsequences: Optional[int],
+        max_evalue: Optional[float],
+        threshold: Optional[float],
+    ):
+        if calibrations is None and max_evalue is not None:
+            raise ValueError("`max_evalue` requires `calibrations`.")
+        if calibrations is not None and (nsequences is None or nsequences < 1):
+            raise ValueError("`nsequences` must be a positive integer.")
+
+        self._calibrations: Mapping[str, "Calibration"] = calibrations or {}
+        self._nsequences = nsequences
+        self._max_evalue = max_evalue
+        self._threshold = threshold
+
+    def threshold(self, accession: str) -> Optional[float]:
+        calib = self._calibrations.get(accession)
+        if calib is None or self._max_evalue is None:
+            return self._threshold
+
+        score = calib.score(self._max_evalue, self._nsequences)
+        if self._threshold is None:
+            return score
+        return max(score, self._threshold)
+
+    def evalue(self, accession: str, result: SearchResult) -> Optional[float]:
+        calib = self._calibrations.get(accession)
+        if calib is None:
+            return None
+        return float(calib.evalue(result.loglikelihood, self._nsequences))
+
+
+def _add_candidates(
+    candidates: Dict[str, List[str]], pairs: Iterable[Tuple[str, str]]
+):
+    for target, query in pairs:
+        queries = candidates.setdefault(str(target), [])
+        if query not in queries:
+            queries.append(str(query))
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if len(batch) == 0:
+            break
+        yield batch
+
+
+def _chunksize(window: int, workers: int) -> int:
+    return max(1, min(64, window // (2 * workers)))
+
+
+def _seqid(target: Target) -> str:
+    return target.defline.split()[0]
+
+
+def _symbols(sequence: Union[str, memoryview], rna: bool) -> bytes:
+    if isinstance(sequence, str):
+        symbols = sequence.encode()
+    else:
+        symbols = sequence.tobytes()
+    if rna and b"T" in symbols:
+        symbols = symbols.translate(_DNA_TO_RNA)
+    return symbols
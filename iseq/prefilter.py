@@ -0,0 +1,85 @@
+from typing import Sequence
+
+from nmm import LPROB_ZERO, SequenceABC
+from numpy import (
+    asarray,
+    concatenate,
+    errstate,
+    frombuffer,
+    full,
+    intp,
+    isnan,
+    maximum,
+    ndarray,
+    uint8,
+    zeros,
+)
+
+__all__ = ["UngappedFilter"]
+
+
+class UngappedFilter:
+    """
+    Ungapped local alignment filter, after HMMER's MSV filter.
+
+    The score of a sequence is the largest sum of match log-odds along a diagonal
+    segment of the (node, position) matrix, allowing neither insertions nor
+    deletions. It is computed one node at a time, each step being a vectorized
+    operation over the whole sequence, and costs a fraction of a Viterbi run.
+
+    Parameters
+    ----------
+    symbols : `bytes`
+        Alphabet symbols, in the order of the emission columns.
+    match_lprobs : `Sequence[Sequence[float]]`
+        Match emission log-probabilities, one row per core node.
+    null_lprobs : `Sequence[float]`
+        Null model emission log-probabilities.
+    """
+
+    def __init__(
+        self,
+        symbols: bytes,
+        match_lprobs: Sequence[Sequence[float]],
+        null_lprobs: Sequence[float],
+    ):
+        with errstate(invalid="ignore"):
+            odds = asarray(match_lprobs, float) - asarray(null_lprobs, float)
+        odds[isnan(odds)] = 0.0
+
+        # The last column scores symbols that do not belong to the alphabet.
+        self._odds = concatenate([odds, zeros((odds.shape[0], 1))], axis=1)
+        self._index = full(256, len(symbols), dtype=intp)
+        for i, symbol in enumerate(symbols):
+            self._index[symbol] = i
+
+    @property
+    def length(self) -> int:
+        return self._odds.shape[0]
+
+    def encode(self, symbols: bytes) -> ndarray:
+        return self._index[frombuffer(symbols, dtype=uint8)]
+
+    def score(self, seq: SequenceABC) -> float:
+        return self._score_codes(self.encode(seq.symbols))
+
+    def _score_codes(self, codes: ndarray) -> float:
+        """
+        Best diagonal segment score of an encoded sequence.
+
+        ``run[i]`` holds the best segment score ending at node ``k`` and position
+        ``i``, which extends the one ending at node ``k - 1`` and position
+        ``i - 1`` or starts anew.
+        """
+        if len(codes) == 0 or self.length == 0:
+            return LPROB_ZERO
+
+        best = LPROB_ZERO
+        run = zeros(len(codes))
+        prev = zeros(len(codes))
+        for k in range(self.length):
+            maximum(run[:-1], 0.0, out=prev[1:])
+            run = prev + self._odds[k, codes]
+            best = max(best, float(run.max()))
+
+        return best
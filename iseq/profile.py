@@ -1,20 +1,102 @@
-from math import log
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from functools import lru_cache
+from math import exp, log
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
-from nmm import LPROB_ZERO, CAlphabet
+from nmm import LPROB_ZERO, CAlphabet, SequenceABC
+from numpy import ndarray
 
 from .model import AltModel, NullModel
+from .path import CompactPath
+from .prefilter import UngappedFilter
 from .result import SearchResult
+from .stats import SearchRecord, SearchStats
+
+_Models = Tuple[NullModel, AltModel]
 
 
 class Profile:
-    def __init__(self, alphabet: CAlphabet):
+    def __init__(
+        self,
+        alphabet: CAlphabet,
+        prefilter: Optional[UngappedFilter] = None,
+        tables: Optional[Dict[str, ndarray]] = None,
+    ):
         self._alphabet = alphabet
+        self._prefilter = prefilter
+        self._tables = tables
+        self._prefilter_threshold: Optional[float] = None
         self._multiple_hits: bool = True
+        self._length_error: float = 0.0
+        self._window_length: int = 0
+        self._window_workers: int = 1
+        self._executor: Optional[Executor] = None
+        self._executor_pid = 0
+        self._stats: Optional[SearchStats] = None
+        self._free_models: List[_WorkModels] = []
+        self._lock = Lock()
 
     @property
     def alphabet(self):
         return self._alphabet
 
+    @property
+    def tables(self) -> Optional[Dict[str, ndarray]]:
+        """
+        Compiled tables the profile has been built from, if any.
+        """
+        return self._tables
+
+    def save(self, file):
+        """
+        Save the compiled form of the profile.
+
+        It can be loaded back with the ``load_profile`` function of the
+        `iseq.standard` or `iseq.frame` module the profile belongs to.
+        """
+        from .cache import save_tables
+
+        if self._tables is None:
+            raise ValueError("This profile has not been built from tables.")
+        save_tables(file, self._tables)
+
+    def __reduce__(self):
+        """
+        Pickle the profile as its tables and settings.
+
+        It is built again from them when unpickled, such as by the worker
+        processes of `search_many`, so that its states are created in the same
+        order and keep their ids. Stats are not pickled.
+        """
+        if self._tables is None:
+            raise TypeError("This profile has not been built from tables.")
+        settings = {
+            "multiple_hits": self._multiple_hits,
+            "length_error": self._length_error,
+            "prefilter_threshold": self._prefilter_threshold,
+            "window_length": self._window_length,
+            "window_workers": self._window_workers,
+        }
+        return (_unpickle_profile, (self._from_tables(), self._tables, settings))
+
+    def _from_tables(self) -> Callable[[Dict[str, ndarray]], "Profile"]:
+        """
+        Function building a profile of this kind from its tables.
+        """
+        raise NotImplementedError()
+
     @property
     def null_model(self) -> NullModel:
         raise NotImplementedError()
@@ -31,69 +113,421 @@ class Profile:
     def multiple_hits(self, multiple_hits: bool):
         self._multiple_hits = multiple_hits
 
-    def search(self, seq: bytes) -> SearchResult:
+    @property
+    def length_error(self) -> float:
+        """
+        Maximum error allowed on the length-dependent log-probabilities.
+
+        Target lengths are rounded into geometric buckets such that every
+        length-dependent special transition differs from its exact value by at
+        most ``length_error``. Consecutive sequences falling in the same bucket
+        do not set those transitions again. Defaults to ``0.0``, which disables
+        rounding.
+        """
+        return self._length_error
+
+    @length_error.setter
+    def length_error(self, length_error: float):
+        if length_error < 0.0:
+            raise ValueError("`length_error` must be non-negative.")
+        self._length_error = length_error
+
+    @property
+    def prefilter(self) -> Optional[UngappedFilter]:
+        return self._prefilter
+
+    @property
+    def prefilter_threshold(self) -> Optional[float]:
+        """
+        Minimum prefilter score for a sequence to be aligned.
+
+        When set, `score` and `search_many` first run the ungapped `prefilter`,
+        and sequences scoring below ``prefilter_threshold`` skip the Viterbi
+        stage altogether. Defaults to ``None``, which disables the prefilter.
+        """
+        return self._prefilter_threshold
+
+    @prefilter_threshold.setter
+    def prefilter_threshold(self, prefilter_threshold: Optional[float]):
+        if prefilter_threshold is not None and self._prefilter is None:
+            raise ValueError("This profile has no prefilter.")
+        self._prefilter_threshold = prefilter_threshold
+
+    def passes_prefilter(self, seq: SequenceABC) -> bool:
+        if self._prefilter_threshold is None:
+            return True
+        return self._prefilter.score(seq) >= self._prefilter_threshold
+
+    @property
+    def window_length(self) -> int:
+        """
+        Length of the windows a sequence is scanned in.
+
+        Sequences longer than ``window_length`` are scanned in overlapping windows,
+        bounding the dynamic programming memory, and the window paths are merged
+        into a single result. The overlap is given by `AltModel.window_overlap`
+        and ``window_length`` must be at least twice as large. Defaults to ``0``,
+        which scans the whole sequence at once.
+        """
+        return self._window_length
+
+    @window_length.setter
+    def window_length(self, window_length: int):
+        if window_length < 0:
+            raise ValueError("`window_length` must be non-negative.")
+        self._window_length = window_length
+
+    @property
+    def window_workers(self) -> int:
+        """
+        Number of threads the windows of a sequence are scanned with.
+
+        Windows are scanned independently before being stitched together, so
+        those of a single long sequence can be scanned on several cores at once.
+        The result is the same for any number of threads. Defaults to ``1``.
+        """
+        return self._window_workers
+
+    @window_workers.setter
+    def window_workers(self, window_workers: int):
+        if window_workers < 1:
+            raise ValueError("`window_workers` must be positive.")
+        self._window_workers = window_workers
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _windows_executor(self) -> Optional[Executor]:
+        """
+        Thread pool the windows of a sequence are scanned on.
+
+        It is created on first use and shared by every search of the profile. A
+        process forked from this one creates a pool of its own, as threads are
+        not carried over by fork.
+        """
+        from os import getpid
+
+        if self._window_workers == 1 or self._window_length == 0:
+            return None
+
+        with self._lock:
+            if self._executor is None or self._executor_pid != getpid():
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(self._window_workers)
+                self._executor_pid = getpid()
+            return self._executor
+
+    @property
+    def stats(self) -> Optional[SearchStats]:
+        """
+        Stats the searches of the profile are recorded into.
+
+        Defaults to ``None``, which records nothing and leaves `search` with a
+        single extra check. Searches run by worker processes of `search_many`
+        are recorded into the copy of the worker, not into this one.
+        """
+        return self._stats
+
+    @stats.setter
+    def stats(self, stats: Optional[SearchStats]):
+        self._stats = stats
+
+    def search(self, seq: SequenceABC) -> SearchResult:
+        """
+        Search a sequence.
+
+        The length-dependent transitions are set on working copies of the
+        models, so the profile itself is left untouched and can be searched from
+        several threads at once.
+        """
+        result = self._search(seq, None)
+        assert result is not None
+        return result
+
+    def search_many(
+        self,
+        sequences: Iterable[SequenceABC],
+        workers: int = 1,
+        chunksize: int = 64,
+        ordered: bool = True,
+        threshold: Optional[float] = None,
+    ) -> Iterator[Any]:
+        """
+        Search several sequences, spreading them over worker processes.
+
+        Each worker receives the profile once, when it starts, instead of a copy
+        per task. Workers are started with the default method of the platform,
+        and a profile that has not been built from tables can only be searched by
+        forked workers, see `__reduce__`. Sequences are sent to
+        the workers in chunks and at most ``2 * workers`` chunks are in flight at
+        any time.
+
+        Parameters
+        ----------
+        sequences : `Iterable[SequenceABC]`
+            Sequences to be searched.
+        workers : `int`
+            Number of worker processes. ``1`` searches in the calling process.
+        chunksize : `int`
+            Number of sequences sent to a worker at once.
+        ordered : `bool`
+            If ``True``, results are yielded in input order. Otherwise, pairs
+            ``(index, result)`` are yielded as soon as they are ready, ``index``
+            being the position of the sequence in ``sequences``.
+        threshold : `Optional[float]`
+            If given, only sequences scoring at least ``threshold`` get a result,
+            which is built from the same Viterbi run the score comes from.
+            ``None`` is returned in place of the result of every other sequence,
+            as it is for sequences rejected by the prefilter.
+        """
+        from ._executor import search_many
+
+        return search_many(self, sequences, workers, chunksize, ordered, threshold)
+
+    def score(self, seq: SequenceABC, prefilter: bool = True) -> float:
+        """
+        Log-likelihood ratio between the alternative and null models.
+
+        It gives the same value as ``search(seq).loglikelihood`` but skips the
+        construction of the path, fragments, and result objects. Sequences
+        rejected by the prefilter score ``LPROB_ZERO``, unless ``prefilter`` is
+        ``False``, which skips it for this call only.
+        """
+        if prefilter and not self.passes_prefilter(seq):
+            return LPROB_ZERO
+
+        with self._target_models(seq.length) as (null_model, alt_model):
+            score0 = null_model.likelihood(seq)
+            score1 = alt_model.viterbi_score(
+                seq, self.window_length, self._windows_executor()
+            )
+        return score1 - score0
+
+    def _search_above(
+        self, seq: SequenceABC, threshold: Optional[float]
+    ) -> Optional[SearchResult]:
+        if not self.passes_prefilter(seq):
+            return None
+        return self._search(seq, threshold)
+
+    def _search(
+        self, seq: SequenceABC, threshold: Optional[float]
+    ) -> Optional[SearchResult]:
+        """
+        Search a sequence, or give ``None`` if it scores below ``threshold``.
+
+        Thresholded searches run the dynamic programming once, and compare its
+        score against ``threshold`` before the result is built.
+        """
+        if self._stats is not None:
+            return self._search_recorded(seq, threshold, self._stats)
+
+        with self._target_models(seq.length) as (null_model, alt_model):
+            score0 = null_model.likelihood(seq)
+            found = self._viterbi(alt_model, seq, score0, threshold)
+        if found is None:
+            return None
+        score1, path = found
+        return self._create_result(score1 - score0, seq, path)
+
+    def _search_recorded(
+        self, seq: SequenceABC, threshold: Optional[float], stats: SearchStats
+    ) -> Optional[SearchResult]:
+        from time import perf_counter
+        from tracemalloc import get_traced_memory
+
+        m0 = get_traced_memory()[0]
+        t0 = perf_counter()
+        with self._target_models(seq.length) as (null_model, alt_model):
+            t1 = perf_counter()
+            score0 = null_model.likelihood(seq)
+            t2 = perf_counter()
+            found = self._viterbi(alt_model, seq, score0, threshold)
+            t3 = perf_counter()
+
+        cells = self.alt_model.length * seq.length
+        if found is None:
+            allocated = get_traced_memory()[0] - m0
+            times = (t1 - t0, t2 - t1, t3 - t2, 0.0)
+            stats.add(SearchRecord(*times, cells, 0, 0, allocated))
+            return None
+
+        score1, path = found
+        result = self._create_result(score1 - score0, seq, path)
+        t4 = perf_counter()
+        allocated = get_traced_memory()[0] - m0
+
+        times = (t1 - t0, t2 - t1, t3 - t2, t4 - t3)
+        counts = (cells, len(path), len(result.homologous))
+        stats.add(SearchRecord(*times, *counts, allocated))
+        return result
+
+    def _viterbi(
+        self,
+        alt_model: AltModel,
+        seq: SequenceABC,
+        score0: float,
+        threshold: Optional[float],
+    ) -> Optional[Tuple[float, CompactPath]]:
+        executor = self._windows_executor()
+        if threshold is None:
+            return alt_model._viterbi(seq, self.window_length, executor)
+
+        min_score = threshold + score0
+        return alt_model._viterbi_above(seq, min_score, self.window_length, executor)
+
+    def _create_result(
+        self, loglik: float, seq: SequenceABC, path: CompactPath
+    ) -> SearchResult:
+        del loglik
         del seq
+        del path
         raise NotImplementedError()
 
     def _set_fragment_length(self):
         if self.alt_model.length == 0:
             return
 
-        B = self.alt_model.special_node.B
-        E = self.alt_model.special_node.E
+        from numpy import full
 
         # Uniform local alignment fragment length distribution
+        L = self.alt_model.length
         t = self.alt_model.special_transitions
-        t.BM = log(2) - log(self.alt_model.length) - log(self.alt_model.length + 1)
+        t.BM = log(2) - log(L) - log(L + 1)
         t.ME = 0.0
-        for node in self.alt_model.core_nodes():
-            self.alt_model.set_transition(B, node.M, t.BM)
-            self.alt_model.set_transition(node.M, E, t.ME)
+        self.alt_model.set_entry_exit(full(L, t.BM), full(L, t.ME))
 
-        for node in self.alt_model.core_nodes()[1:]:
-            self.alt_model.set_transition(node.D, E, 0.0)
+    @contextmanager
+    def _target_models(self, length: int) -> Iterator[_Models]:
+        """
+        Null and alternative models set for a target length, for one search.
 
-    def _set_target_length(self, length: int):
-        from math import exp
+        The models of the profile are never changed. Searches run on working
+        copies of them instead, which are handed out one per search at a time and
+        are only created when every existing one is in use, so there are as many
+        copies as concurrent searches rather than one per target length. The
+        length-dependent special transitions of a copy are set again only when
+        the length bucket it is handed out for changes.
+        """
+        with self._lock:
+            models = self._free_models.pop() if len(self._free_models) > 0 else None
 
-        L = length
-        if L == 0:
-            return
+        if models is None:
+            models = _WorkModels(self.null_model.copy(), self.alt_model.copy())
 
-        if self._multiple_hits:
-            l1q = lq = -log(2)
-        else:
-            lq = LPROB_ZERO
-            l1q = log(1.0)
+        try:
+            if length > 0:
+                bucket = _length_bucket(length, self._length_error)
+                models.set_target_length((bucket, self._multiple_hits))
+            yield (models.null_model, models.alt_model)
+        finally:
+            with self._lock:
+                self._free_models.append(models)
 
-        q = exp(lq)
-        lp = log(L) - log(L + 2 + q / (1 - q))
-        l1p = log(2 + q / (1 - q)) - log(L + 2 + q / (1 - q))
-        lr = log(L) - log(L + 1)
 
-        t = self.alt_model.special_transitions
+def _unpickle_profile(
+    from_tables: Callable[[Dict[str, ndarray]], Profile],
+    tables: Dict[str, ndarray],
+    settings: Dict[str, Any],
+) -> Profile:
+    profile = from_tables(tables)
+    for name, value in settings.items():
+        setattr(profile, name, value)
+    return profile
+
+
+class _WorkModels:
+    """
+    Working copies of the models of a profile, and the target length key their
+    special transitions have been set for.
+    """
+
+    def __init__(self, null_model: NullModel, alt_model: AltModel):
+        self.null_model = null_model
+        self.alt_model = alt_model
+        self.key: Optional[Tuple[int, bool]] = None
+
+    def set_target_length(self, key: Tuple[int, bool]):
+        if key != self.key:
+            _apply_target_length(self.null_model, self.alt_model, key)
+            self.key = key
+
+
+def _apply_target_length(
+    null_model: NullModel, alt_model: AltModel, key: Tuple[int, bool]
+):
+    lprobs = _target_length_lprobs(*key)
+    t = alt_model.special_transitions
+
+    t.NN = t.CC = t.JJ = lprobs.lp
+    t.NB = t.CT = t.JB = lprobs.l1p
+    t.RR = lprobs.lr
+    t.EJ = lprobs.lq
+    t.EC = lprobs.l1q
+
+    node = alt_model.special_node
+
+    alt_model.set_transition(node.S, node.B, t.NB)
+    alt_model.set_transition(node.S, node.N, t.NN)
+    alt_model.set_transition(node.N, node.N, t.NN)
+    alt_model.set_transition(node.N, node.B, t.NB)
+
+    alt_model.set_transition(node.E, node.T, t.EC + t.CT)
+    alt_model.set_transition(node.E, node.C, t.EC + t.CC)
+    alt_model.set_transition(node.C, node.C, t.CC)
+    alt_model.set_transition(node.C, node.T, t.CT)
+
+    alt_model.set_transition(node.E, node.B, t.EJ + t.JB)
+    alt_model.set_transition(node.E, node.J, t.EJ + t.JJ)
+    alt_model.set_transition(node.J, node.J, t.JJ)
+    alt_model.set_transition(node.J, node.B, t.JB)
+
+    null_model.set_transition(t.RR)
+
+
+class TargetLengthLProbs(NamedTuple):
+    lp: float
+    l1p: float
+    lr: float
+    lq: float
+    l1q: float
+
+
+@lru_cache(maxsize=4096)
+def _target_length_lprobs(length: int, multiple_hits: bool) -> TargetLengthLProbs:
+    L = length
+    if multiple_hits:
+        l1q = lq = -log(2)
+    else:
+        lq = LPROB_ZERO
+        l1q = log(1.0)
 
-        t.NN = t.CC = t.JJ = lp
-        t.NB = t.CT = t.JB = l1p
-        t.RR = lr
-        t.EJ = lq
-        t.EC = l1q
+    q = exp(lq)
+    lp = log(L) - log(L + 2 + q / (1 - q))
+    l1p = log(2 + q / (1 - q)) - log(L + 2 + q / (1 - q))
+    lr = log(L) - log(L + 1)
 
-        node = self.alt_model.special_node
+    return TargetLengthLProbs(lp, l1p, lr, lq, l1q)
 
-        self.alt_model.set_transition(node.S, node.B, t.NB)
-        self.alt_model.set_transition(node.S, node.N, t.NN)
-        self.alt_model.set_transition(node.N, node.N, t.NN)
-        self.alt_model.set_transition(node.N, node.B, t.NB)
 
-        self.alt_model.set_transition(node.E, node.T, t.EC + t.CT)
-        self.alt_model.set_transition(node.E, node.C, t.EC + t.CC)
-        self.alt_model.set_transition(node.C, node.C, t.CC)
-        self.alt_model.set_transition(node.C, node.T, t.CT)
+def _length_bucket(length: int, error: float) -> int:
+    """
+    Representative length of the bucket ``length`` falls in.
 
-        self.alt_model.set_transition(node.E, node.B, t.EJ + t.JB)
-        self.alt_model.set_transition(node.E, node.J, t.EJ + t.JJ)
-        self.alt_model.set_transition(node.J, node.J, t.JJ)
-        self.alt_model.set_transition(node.J, node.B, t.JB)
+    Every length-dependent log-probability has the form ``log(a) - log(L + c)``
+    or ``log(L) - log(L + c)`` for constants ``a, c > 0``, whose derivatives with
+    respect to ``log(L)`` lie in ``[-1, 1]``. Keeping ``log`` of the
+    representative within ``error`` of ``log(length)`` therefore bounds the error
+    of each transition by ``error``.
+    """
+    if error == 0.0 or length <= 1:
+        return length
 
-        self.null_model.set_transition(t.RR)
+    width = 2 * error
+    bucket = int(round(exp(round(log(length) / width) * width)))
+    if bucket < 1 or abs(log(bucket) - log(length)) > error:
+        return length
+    return bucket
@@ -1,54 +1,126 @@
 from abc import ABC, abstractmethod
-from typing import Sequence
+from typing import List, Optional, Sequence
 
-from nmm import CPath, Interval
+from nmm import Interval, SequenceABC
+from numpy import ndarray
 
 from .fragment import Fragment
+from .path import CompactPath
 
 
 class SearchResult(ABC):
-    def _create_fragments(self, path: CPath):
+    """
+    Result of a profile search.
 
-        frag_start = frag_stop = 0
-        step_start = step_stop = 0
-        homologous = False
+    Only the fragment boundaries are computed up front, from the arrays of the
+    path. Intervals are created on first access and fragments, together
+    with their paths and sequence slices, only when `fragments` is accessed.
 
-        for step_stop, step in enumerate(path):
+    Parameters
+    ----------
+    loglik : `float`
+        Log-likelihood ratio.
+    sequence : `SequenceABC`
+        Searched sequence.
+    path : `CompactPath`
+        Viterbi path.
+    """
 
-            change = not homologous and step.state.name.startswith(b"M")
-            change = change or homologous and step.state.name.startswith(b"E")
-            change = change or not homologous and step.state.name.startswith(b"T")
+    def __init__(self, loglik: float, sequence: SequenceABC, path: CompactPath):
+        self._loglik = loglik
+        self._sequence = sequence
+        self._path = path
+        self._bounds = fragment_bounds(path.kinds, path.seq_lens)
+        self._intervals: Optional[List[Interval]] = None
+        self._fragments: Optional[List[Fragment]] = None
 
-            if change:
-                if frag_start < frag_stop:
-                    fragi = Interval(frag_start, frag_stop)
-                    stepi = Interval(step_start, step_stop)
-                    yield (fragi, stepi, homologous)
-
-                frag_start = frag_stop
-                step_start = step_stop
-                homologous = not homologous
-
-            frag_stop += step.seq_len
+    @property
+    def path(self) -> CompactPath:
+        return self._path
 
-    # @property
-    # def symbols(self) -> bytes:
-    #     return b"".join(frag.subsequence.symbols for frag in self.fragments)
+    @property
+    def sequence(self) -> SequenceABC:
+        return self._sequence
 
     @property
-    @abstractmethod
     def fragments(self) -> Sequence[Fragment]:
-        raise NotImplementedError()
+        if self._fragments is None:
+            self._fragments = []
+            for start, stop, step_start, step_stop, homologous in self._bounds:
+                seq = self._sequence.slice(Interval(int(start), int(stop)))
+                path = self._path[step_start:step_stop]
+                frag = self._create_fragment(seq, path, bool(homologous))
+                self._fragments.append(frag)
+        return self._fragments
 
     @property
-    @abstractmethod
     def intervals(self) -> Sequence[Interval]:
-        raise NotImplementedError()
+        if self._intervals is None:
+            bounds = self._bounds[:, :2].tolist()
+            self._intervals = [Interval(start, stop) for start, stop in bounds]
+        return self._intervals
+
+    @property
+    def homologous(self) -> Sequence[bool]:
+        """
+        Homology of every fragment, without creating the fragments.
+        """
+        return self._bounds[:, 4].astype(bool).tolist()
 
     @property
-    @abstractmethod
     def loglikelihood(self) -> float:
+        return self._loglik
+
+    @abstractmethod
+    def _create_fragment(
+        self, sequence: SequenceABC, path: CompactPath, homologous: bool
+    ) -> Fragment:
         raise NotImplementedError()
 
+    # @property
+    # def symbols(self) -> bytes:
+    #     return b"".join(frag.subsequence.symbols for frag in self.fragments)
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}:{str(self)}>"
+
+
+def fragment_bounds(kinds: ndarray, seq_lens: ndarray) -> ndarray:
+    """
+    Fragment boundaries of a path.
+
+    A homologous fragment starts at the match state entered from ``B`` and stops
+    before the following ``E``, and non-homologous fragments fill the gaps up to
+    ``T``. Empty fragments are dropped.
+
+    Parameters
+    ----------
+    kinds : `ndarray`
+        First byte of the state name of every step.
+    seq_lens : `ndarray`
+        Emission length of every step.
+
+    Returns
+    -------
+    `ndarray`
+        One ``(start, stop, step_start, step_stop, homologous)`` row per
+        fragment, ``start`` and ``stop`` being sequence positions and
+        ``step_start`` and ``step_stop`` step indices.
+    """
+    from numpy import arange, concatenate, cumsum, flatnonzero, stack, zeros
+
+    M, E, T, B = (ord(c) for c in "METB")
+    entry = zeros(len(kinds), dtype=bool)
+    entry[1:] = (kinds[1:] == M) & (kinds[:-1] == B)
+    change = flatnonzero(entry | (kinds == E) | (kinds == T))
+
+    offsets = concatenate([[0], cumsum(seq_lens)])
+    step_start = concatenate([[0], change])[:-1]
+    step_stop = change
+    start = offsets[step_start]
+    stop = offsets[step_stop]
+    homologous = arange(len(change)) % 2 == 1
+
+    rows = stack([start, stop, step_start, step_stop, homologous], axis=1)
+    return rows[start < stop].astype(int).reshape((-1, 5))
+
@@ -1,3 +1,3 @@
-from .profile import create_profile
+from .profile import StandardProfile, create_profile, load_profile
 
-__all__ = ["create_profile"]
+__all__ = ["StandardProfile", "create_profile", "load_profile"]
@@ -1,6 +1,7 @@
-from typing import Dict, List, Sequence, Tuple, Union
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Tuple, Union
 
-from nmm import CData, CSequence, MuteState, NormalState
+from nmm import CSequence, MuteState, NormalState
 
 from ..model import AltModel, Node, NullModel, SpecialNode, Transitions
 from .path import StandardPath
@@ -90,6 +91,8 @@ class StandardNullModel(NullModel):
 
 
 class StandardAltModel(AltModel):
+    _path_type = StandardPath
+
     def __init__(
         self,
         special_node: StandardSpecialNode,
@@ -97,15 +100,6 @@ class StandardAltModel(AltModel):
     ):
         self._special_node = special_node
         self._core_nodes = [nt[0] for nt in nodes_trans]
-        self._states: Dict[CData, Union[MuteState, NormalState]] = {}
-
-        for node in self._core_nodes:
-            for state in node.states():
-                self._states[state.imm_state] = state
-
-        for state in special_node.states():
-            self._states[state.imm_state] = state
-
         super().__init__(special_node, nodes_trans)
 
     @property
@@ -120,17 +114,9 @@ class StandardAltModel(AltModel):
         return self._special_node
 
     def viterbi(
-        self, seq: CSequence, window_length: int = 0
+        self,
+        seq: CSequence,
+        window_length: int = 0,
+        executor: Optional[Executor] = None,
     ) -> Tuple[float, StandardPath]:
-        # score, path = super().viterbi(seq)
-        results = super().viterbi(seq, window_length)
-        # TODO: implement multiple windows
-        assert len(results) == 1
-
-        path = results[0].path
-        score = results[0].loglikelihood
-
-        steps = [(self._states[step.state.imm_state], step.seq_len) for step in path]
-        new_path = StandardPath(steps)
-
-        return (score, new_path)
+        return self._viterbi(seq, window_length, executor)
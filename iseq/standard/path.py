@@ -1,26 +1,23 @@
-from typing import Sequence, Tuple, Union
+from typing import Union
 
-from nmm import CPath, MuteState, NormalState, create_imm_path
+from nmm import MuteState, NormalState
 
+from ..path import CompactPath
 from .step import StandardStep
 
 
-class StandardPath(CPath):
+class StandardPath(CompactPath):
     """
     Path for standard profile.
 
-    Parameters
-    ----------
-    steps : `Sequence[Tuple[Union[MuteState, NormalState], int]]`
-        Steps.
+    Steps are created as `StandardStep` objects on access only. See
+    `CompactPath`.
     """
 
-    def __init__(self, steps: Sequence[Tuple[Union[MuteState, NormalState], int]]):
-        self.__steps = [StandardStep(step[0], step[1]) for step in steps]
-        super().__init__(create_imm_path(self.__steps), self.__steps)
+    def _create_step(
+        self, state: Union[MuteState, NormalState], seq_len: int
+    ) -> StandardStep:
+        return StandardStep(state, seq_len)
 
     def __getitem__(self, i) -> StandardStep:
-        return self.__steps[i]
-
-    def __repr__(self):
-        return f"<{self.__class__.__name__}:{str(self)}>"
+        return super().__getitem__(i)
@@ -1,9 +1,13 @@
-from typing import Any, Dict, List, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from nmm import LPROB_ZERO, Alphabet, CSequence, MuteState, NormalState, lprob_normalize
+from nmm import Alphabet, CSequence, MuteState, NormalState
+from numpy import ndarray
 
 from hmmer_reader import HMMERProfile
 
+from .._tables import read_tables
+from ..cache import load_tables
+from ..prefilter import UngappedFilter
 from ..profile import Profile
 from .model import (
     StandardAltModel,
@@ -12,6 +16,7 @@ from .model import (
     StandardSpecialNode,
     Transitions,
 )
+from .path import StandardPath
 from .result import StandardSearchResult
 
 
@@ -21,8 +26,10 @@ class StandardProfile(Profile):
         alphabet: Alphabet,
         null_lprobs: Sequence[float],
         nodes_trans: Sequence[Tuple[StandardNode, Transitions]],
+        prefilter: Optional[UngappedFilter] = None,
+        tables: Optional[Dict[str, ndarray]] = None,
     ):
-        super().__init__(alphabet)
+        super().__init__(alphabet, prefilter, tables)
         R = NormalState(b"R", alphabet, null_lprobs)
         self._null_model = StandardNullModel(R)
 
@@ -47,45 +54,50 @@ class StandardProfile(Profile):
     def alt_model(self) -> StandardAltModel:
         return self._alt_model
 
-    def search(self, seq: CSequence) -> StandardSearchResult:
-        self._set_target_length(seq.length)
-        score0 = self.null_model.likelihood(seq)
-        score1, path = self.alt_model.viterbi(seq)
-        score = score1 - score0
-        return StandardSearchResult(score, seq, path)
+    def _from_tables(self):
+        return create_from_tables
+
+    def _create_result(
+        self, loglik: float, seq: CSequence, path: StandardPath
+    ) -> StandardSearchResult:
+        return StandardSearchResult(loglik, seq, path)
 
 
 def create_profile(reader: HMMERProfile) -> StandardProfile:
+    """
+    Create a standard profile from a HMMER profile.
+
+    Parameters
+    ----------
+    reader : `HMMERProfile`
+        HMMER profile.
+    """
+    return create_from_tables(read_tables(reader))
+
 
-    alphabet = Alphabet(reader.alphabet.encode(), b"X")
+def load_profile(file) -> StandardProfile:
+    """
+    Load a standard profile saved by `Profile.save`.
+    """
+    return create_from_tables(load_tables(file))
 
-    prob_list = _create_probability_list(alphabet.symbols)
-    null_lprobs = prob_list(reader.insert(0))
+
+def create_from_tables(tables: Dict[str, ndarray]) -> StandardProfile:
+    symbols = tables["symbols"].tobytes()
+    alphabet = Alphabet(symbols, b"X")
+    null_lprobs = tables["null"]
 
     nodes_trans: List[Tuple[StandardNode, Transitions]] = []
 
-    for m in range(1, reader.M + 1):
-        M = NormalState(f"M{m}".encode(), alphabet, prob_list(reader.match(m)))
-        I = NormalState(f"I{m}".encode(), alphabet, prob_list(reader.insert(m)))
+    for m in range(1, tables["match"].shape[0] + 1):
+        M = NormalState(f"M{m}".encode(), alphabet, tables["match"][m - 1])
+        I = NormalState(f"I{m}".encode(), alphabet, tables["insert"][m - 1])
         D = MuteState(f"D{m}".encode(), alphabet)
 
         node = StandardNode(M, I, D)
-
-        trans = Transitions(**reader.trans(m - 1))
-        trans.normalize()
+        trans = Transitions(*tables["trans"][m - 1].tolist())
 
         nodes_trans.append((node, trans))
 
-    return StandardProfile(alphabet, null_lprobs, nodes_trans)
-
-
-def _create_probability_list(symbols: bytes):
-    def probability_list(lprob_table: Dict[str, Any]):
-        probs = []
-        for i in range(len(symbols)):
-            key = symbols[i : i + 1].decode()
-            probs.append(lprob_table.get(key, LPROB_ZERO))
-
-        return lprob_normalize(probs)
-
-    return probability_list
+    prefilter = UngappedFilter(symbols, tables["match"], null_lprobs)
+    return StandardProfile(alphabet, null_lprobs, nodes_trans, prefilter, tables)
@@ -1,6 +1,6 @@
-from typing import List, Sequence
+from typing import Sequence
 
-from nmm import Interval, SequenceABC
+from nmm import SequenceABC
 
 from ..result import SearchResult
 from .fragment import StandardFragment
@@ -9,27 +9,17 @@ from .path import StandardPath
 
 class StandardSearchResult(SearchResult):
     def __init__(self, loglik: float, sequence: SequenceABC, path: StandardPath):
-        self._loglik = loglik
-        self._fragments: List[StandardFragment] = []
-        self._intervals: List[Interval] = []
-
-        steps = list(path)
-        for fragi, stepi, homologous in self._create_fragments(path):
-            substeps = steps[stepi.start : stepi.stop]
-            fragment_path = StandardPath([(s.state, s.seq_len) for s in substeps])
-            seq = sequence.slice(fragi)
-            frag = StandardFragment(seq, fragment_path, homologous)
-            self._fragments.append(frag)
-            self._intervals.append(fragi)
+        super().__init__(loglik, sequence, path)
 
     @property
-    def fragments(self) -> Sequence[StandardFragment]:
-        return self._fragments
+    def path(self) -> StandardPath:
+        return self._path
 
     @property
-    def intervals(self) -> Sequence[Interval]:
-        return self._intervals
+    def fragments(self) -> Sequence[StandardFragment]:
+        return super().fragments
 
-    @property
-    def loglikelihood(self) -> float:
-        return self._loglik
+    def _create_fragment(
+        self, sequence: SequenceABC, path: StandardPath, homologous: bool
+    ) -> StandardFragment:
+        return StandardFragment(sequence, path, homologous)
@@ -1,9 +1,11 @@
+import pytest
 from numpy.testing import assert_allclose, assert_equal
 
 from hmmer_reader import open_hmmer
 
-from nmm import Sequence
-from iseq.standard import create_profile
+from nmm import LPROB_ZERO, Path, Sequence
+from iseq.standard import create_profile, load_profile
+from iseq.stats import SearchStats
 
 
 def test_standard_profile_unihit_homologous_1(PF03373):
@@ -152,3 +154,271 @@ def test_standard_profile_multihit_homologous1(PF03373):
     assert_equal(frags[1].homologous, True)
     assert_equal(frags[1].sequence.symbols, b"PGKEDNNK")
     assert_equal(frags[2].homologous, False)
+
+
+def test_standard_profile_search_many(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    alphabet = hmmer.alphabet
+    symbols = [b"PGKEDNNK", b"PGKENNK", b"PGKEPNNK", b"KKKPGKEDNNK"]
+    seqs = [Sequence(s, alphabet) for s in symbols]
+    expected = [hmmer.search(seq).loglikelihood for seq in seqs]
+
+    results = list(hmmer.search_many(seqs, workers=2, chunksize=1))
+    assert_allclose([r.loglikelihood for r in results], expected)
+    frags = results[3].fragments
+    assert_equal(len(frags), 2)
+    assert_equal(frags[0].sequence.symbols, b"KKK")
+    assert_equal(frags[1].sequence.symbols, b"PGKEDNNK")
+
+    results = dict(hmmer.search_many(seqs, workers=2, ordered=False))
+    assert_equal(sorted(results.keys()), [0, 1, 2, 3])
+    assert_allclose([results[i].loglikelihood for i in range(4)], expected)
+
+    with pytest.raises(ValueError):
+        hmmer.search_many(seqs, workers=0)
+
+
+def test_standard_profile_windows(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    alphabet = hmmer.alphabet
+    seq = Sequence((b"A" * 40 + b"PGKEDNNK") * 4 + b"A" * 40, alphabet)
+    r = hmmer.search(seq)
+    intervals = _homologous_intervals(r)
+    assert_equal(len(intervals), 4)
+
+    assert_equal(hmmer.alt_model.window_overlap(), 32)
+    hmmer.window_length = 64
+    rw = hmmer.search(seq)
+    intervals_w = _homologous_intervals(rw)
+    assert_equal(intervals_w, intervals)
+    assert_allclose(rw.loglikelihood, r.loglikelihood)
+
+    hmmer.window_workers = 3
+    rt = hmmer.search(seq)
+    assert_equal(_homologous_intervals(rt), intervals)
+    assert_allclose(rt.loglikelihood, r.loglikelihood)
+    assert_allclose(hmmer.score(seq), r.loglikelihood)
+    assert hmmer._windows_executor() is hmmer._windows_executor()
+
+
+def test_standard_profile_hit_free_windows(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    # Windows past the single hit have no homology, yet each of them is scanned
+    # through a hit of its own.
+    seq = Sequence(b"A" * 40 + b"PGKEDNNK" + b"A" * 200, hmmer.alphabet)
+    r = hmmer.search(seq)
+    intervals = _homologous_intervals(r)
+    assert_equal(len(intervals), 1)
+
+    hmmer.window_length = 64
+    rw = hmmer.search(seq)
+    assert_equal(_homologous_intervals(rw), intervals)
+    assert_allclose(rw.loglikelihood, r.loglikelihood)
+
+
+def test_standard_profile_score(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    alphabet = hmmer.alphabet
+    seq = Sequence(b"PPPPGKEDNNKDDDPGKEDNNKEEEE", alphabet)
+    assert_allclose(hmmer.score(seq), 20.329227532144742)
+    assert_allclose(hmmer.score(seq), hmmer.search(seq).loglikelihood)
+
+    seqs = [Sequence(b"PGKEDNNK", alphabet), Sequence(b"PGKENNK", alphabet)]
+    results = list(hmmer.search_many(seqs, threshold=5.0))
+    assert_allclose(results[0].loglikelihood, 11.867796719423442)
+    assert_equal(results[1], None)
+
+
+def test_standard_profile_prefilter(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    alphabet = hmmer.alphabet
+    homologous = Sequence(b"KKKPGKEDNNK", alphabet)
+    nonhomologous = Sequence(b"WWWWWWWWWWW", alphabet)
+    score0 = hmmer.prefilter.score(nonhomologous)
+    score1 = hmmer.prefilter.score(homologous)
+    assert score0 < score1
+
+    hmmer.prefilter_threshold = (score0 + score1) / 2
+    assert_allclose(hmmer.score(homologous), 10.707618955640605)
+    assert_equal(hmmer.score(nonhomologous), LPROB_ZERO)
+    assert hmmer.score(nonhomologous, prefilter=False) > LPROB_ZERO
+    assert hmmer.prefilter_threshold == (score0 + score1) / 2
+    results = list(hmmer.search_many([homologous, nonhomologous]))
+    assert_equal(len(results[0].fragments), 2)
+    assert_equal(results[1], None)
+
+
+def test_standard_profile_save_load(PF03373, tmp_path):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    hmmer.save(tmp_path / "PF03373.npz")
+    loaded = load_profile(tmp_path / "PF03373.npz")
+
+    seq = Sequence(b"KKKPGKEDNNK", loaded.alphabet)
+    assert_allclose(loaded.search(seq).loglikelihood, 10.707618955640605)
+
+
+def test_standard_profile_null_likelihood(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    for symbols in [b"K", b"KKKPGKEDNNK", b"PPPPGKEDNNKDDDPGKEDNNKEEEE"]:
+        seq = Sequence(symbols, hmmer.alphabet)
+        with hmmer._target_models(seq.length) as (null, _):
+            path = Path([(null.state, 1) for _ in range(seq.length)])
+            assert_allclose(null.likelihood(seq), null._hmm.likelihood(seq, path))
+
+
+def test_standard_profile_lazy_fragments(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    seq = Sequence(b"PPPPGKEDNNKDDDPGKEDNNKEEEE", hmmer.alphabet)
+    result = hmmer.search(seq)
+    homologous = result.homologous
+    intervals = [(i.start, i.stop) for i in result.intervals]
+    assert result._fragments is None
+
+    frags = result.fragments
+    assert_equal(homologous, [f.homologous for f in frags])
+    assert_equal(intervals, [(0, 3), (3, 11), (11, 14), (14, 22), (22, 26)])
+    symbols = b"".join(f.sequence.symbols for f in frags)
+    assert_equal(symbols, seq.symbols)
+
+
+def test_standard_profile_compact_path(PF03373):
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    seq = Sequence(b"KKKPGKEDNNK", hmmer.alphabet)
+    with hmmer._target_models(seq.length) as (_, alt_model):
+        score, path = alt_model.viterbi(seq)
+        assert_allclose(alt_model._hmm.likelihood(seq, path), score)
+
+    assert_equal(len(path), len(path.state_ids))
+    assert_equal(path.seq_lens.sum(), seq.length)
+    assert_equal(str(path[0]), "<S,0>")
+    assert_equal(path[-1].state.name, b"T")
+    assert_equal(len(path[1:3]), 2)
+    assert path.table is hmmer.alt_model.state_table
+
+
+def test_standard_profile_stats(PF03373):
+    import tracemalloc
+
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    records = []
+    stats = SearchStats(records.append)
+    hmmer.stats = stats
+    seqs = [b"KKKPGKEDNNK", b"PPPPGKEDNNKDDDPGKEDNNKEEEE"]
+    results = [hmmer.search(Sequence(s, hmmer.alphabet)) for s in seqs]
+    hmmer.stats = None
+    hmmer.search(Sequence(seqs[0], hmmer.alphabet))
+
+    assert_equal(stats.nsearches, 2)
+    assert_equal(len(records), 2)
+    assert_equal(stats.cells, 8 * (11 + 26))
+    assert_equal(stats.steps, sum(len(r.path) for r in results))
+    assert_equal(stats.fragments, sum(len(r.fragments) for r in results))
+    assert stats.seconds["viterbi"] > 0
+    assert_allclose(stats.total_seconds, sum(sum(r[:4]) for r in records))
+
+    total = SearchStats()
+    total.merge(stats)
+    total.merge(stats)
+    assert_equal(total.as_dict()["cells"], 2 * stats.cells)
+
+    stats = SearchStats()
+    hmmer.stats = stats
+    tracemalloc.start()
+    try:
+        result = hmmer.search(Sequence(seqs[1], hmmer.alphabet))
+    finally:
+        tracemalloc.stop()
+    assert result is not None
+    assert stats.allocated > 0
+
+
+def test_standard_profile_threads(PF03373):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    seqs = [b"KKKPGKEDNNK", b"PPPPGKEDNNKDDDPGKEDNNKEEEE", b"PGKEDNNK"] * 10
+    seqs = [Sequence(s, hmmer.alphabet) for s in seqs]
+    expected = [hmmer.search(seq).loglikelihood for seq in seqs]
+
+    with ThreadPoolExecutor(4) as executor:
+        scores = list(executor.map(lambda seq: hmmer.search(seq).loglikelihood, seqs))
+    assert_allclose(scores, expected)
+    assert_allclose(expected[0], 10.707618955640605)
+
+    # There is at most one copy of the models per concurrent search, and a
+    # single one for searches made one at a time, whatever the target length.
+    assert 1 <= len(hmmer._free_models) <= 4
+    hmmer._free_models.clear()
+    for seq in seqs:
+        hmmer.search(seq)
+    assert_equal(len(hmmer._free_models), 1)
+
+    with hmmer._target_models(11) as (null_model, alt_model):
+        assert alt_model is not hmmer.alt_model
+        assert null_model is not hmmer.null_model
+        with hmmer._target_models(11) as (_, other):
+            assert other is not alt_model
+
+
+def _homologous_intervals(result):
+    frags = zip(result.intervals, result.fragments)
+    return [(i.start, i.stop) for i, f in frags if f.homologous]
+
+
+def test_standard_profile_core_transitions(PF03373):
+    from numpy import zeros
+
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+
+    alt = hmmer.alt_model
+    with pytest.raises(ValueError):
+        alt.set_core_transitions(zeros((alt.length + 1, 7)))
+
+    seq = Sequence(b"PPPPGKEDNNKDDDPGKEDNNKEEEE", hmmer.alphabet)
+    expected = hmmer.search(seq).loglikelihood
+    alt.set_core_transitions(alt._core_trans.copy())
+    hmmer._free_models.clear()
+    assert_allclose(hmmer.search(seq).loglikelihood, expected)
+
+    copy = alt.copy()
+    assert_equal(copy._transition_lprobs(), alt._transition_lprobs())
+
+
+def test_standard_profile_pickle(PF03373):
+    import pickle
+
+    with open_hmmer(PF03373) as reader:
+        hmmer = create_profile(reader.read_profile())
+    hmmer.multiple_hits = False
+    hmmer.window_length = 4096
+
+    loaded = pickle.loads(pickle.dumps(hmmer))
+    assert_equal(loaded.multiple_hits, False)
+    assert_equal(loaded.window_length, 4096)
+    assert_equal(loaded.alt_model.state_table.kinds, hmmer.alt_model.state_table.kinds)
+
+    seq = Sequence(b"PPPPGKEDNNKDDDPGKEDNNKEEEE", hmmer.alphabet)
+    assert_allclose(loaded.search(seq).loglikelihood, hmmer.search(seq).loglikelihood)
@@ -0,0 +1,112 @@
+from threading import Lock
+from typing import Callable, Dict, NamedTuple, Optional
+
+__all__ = ["SearchRecord", "SearchStats"]
+
+
+class SearchRecord(NamedTuple):
+    """
+    Timings, in seconds, and counters of a single search.
+
+    ``cells`` is the number of dynamic programming cells, the model length times
+    the sequence length, ``steps`` the length of the Viterbi path, and
+    ``fragments`` the number of fragments of the result. ``allocated`` is the net
+    number of bytes allocated through the Python allocator during the search, the
+    result included, as traced by `tracemalloc`. It is zero unless `tracemalloc`
+    is tracing, and includes the allocations of other threads searching at the
+    same time.
+    """
+
+    target_length: float
+    null_model: float
+    viterbi: float
+    result: float
+    cells: int
+    steps: int
+    fragments: int
+    allocated: int
+
+
+class SearchStats:
+    """
+    Timings and counters of profile searches, summed over searches.
+
+    Searches are recorded while the stats object is attached to a profile through
+    `Profile.stats`. The stages are setting the target length transitions,
+    scoring the null model, running Viterbi and laying the path out, and creating
+    the result. Stats gathered apart, such as in different processes, can be
+    summed with `merge`. Searches can be recorded from several threads at once.
+    Allocations are only recorded while `tracemalloc` is tracing, see
+    `SearchRecord`.
+
+    Parameters
+    ----------
+    callback : `Optional[Callable[[SearchRecord], None]]`
+        Function called with the record of every search, after it is summed.
+    """
+
+    stages = ("target_length", "null_model", "viterbi", "result")
+
+    def __init__(self, callback: Optional[Callable[[SearchRecord], None]] = None):
+        self._callback = callback
+        self._lock = Lock()
+        self.nsearches = 0
+        self.seconds: Dict[str, float] = {stage: 0.0 for stage in self.stages}
+        self.cells = 0
+        self.steps = 0
+        self.fragments = 0
+        self.allocated = 0
+
+    def add(self, record: SearchRecord):
+        with self._lock:
+            self.nsearches += 1
+            for stage in self.stages:
+                self.seconds[stage] += getattr(record, stage)
+            self.cells += record.cells
+            self.steps += record.steps
+            self.fragments += record.fragments
+            self.allocated += record.allocated
+        if self._callback is not None:
+            self._callback(record)
+
+    def merge(self, other: "SearchStats"):
+        """
+        Add the searches recorded by another stats object.
+        """
+        with self._lock:
+            self.nsearches += other.nsearches
+            for stage in self.stages:
+                self.seconds[stage] += other.seconds[stage]
+            self.cells += other.cells
+            self.steps += other.steps
+            self.fragments += other.fragments
+            self.allocated += other.allocated
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.seconds.values())
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "nsearches": self.nsearches,
+            **{f"{stage}_seconds": sec for stage, sec in self.seconds.items()},
+            "cells": self.cells,
+            "steps": self.steps,
+            "fragments": self.fragments,
+            "allocated": self.allocated,
+        }
+
+    def __str__(self) -> str:
+        total = self.total_seconds
+        lines = [f"searches: {self.nsearches}"]
+        for stage, sec in self.seconds.items():
+            share = 100 * sec / total if total > 0 else 0.0
+            lines.append(f"{stage}: {sec:.6f}s ({share:.1f}%)")
+        lines.append(f"cells: {self.cells}")
+        lines.append(f"steps: {self.steps}")
+        lines.append(f"fragments: {self.fragments}")
+        lines.append(f"allocated: {self.allocated} bytes")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}:{self.nsearches} searches>"
@@ -0,0 +1,41 @@
+from hmmer_reader import open_hmmer
+from numpy.testing import assert_allclose, assert_equal
+
+from iseq.cache import ProfileCache
+from iseq.calibration import calibrate, sample_null
+from iseq.standard import create_profile
+
+
+def test_calibration_sample_null(PF03373):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    seqs = sample_null(profile, 10, 50, seed=1)
+    assert_equal(seqs.shape, (10, 50))
+    assert set(seqs.tobytes()) <= set(profile.alphabet.symbols)
+    assert_equal(sample_null(profile, 10, 50, seed=1), seqs)
+
+
+def test_calibration_calibrate(PF03373, tmp_path):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    calib = calibrate(profile, nsamples=50, length=100)
+    assert calib.lambda_ > 0
+    assert calib.evalue(calib.mu + 10, 1000) < calib.evalue(calib.mu, 1000)
+    assert_allclose(calib.pvalue(calib.mu), 1 - 1 / 2.718281828459045)
+    assert_allclose(calib.evalue(calib.score(0.01, 1000), 1000), 0.01)
+
+    parallel = calibrate(profile, nsamples=50, length=100, workers=2)
+    assert_allclose(parallel, calib)
+
+    cache = ProfileCache(tmp_path / "cache")
+    for _ in range(2):
+        assert_allclose(calibrate(profile, 50, 100, cache=cache), calib)
+    assert_equal(len(list(cache.directory.glob("*.npz"))), 1)
+
+    profile.length_error = 0.1
+    calibrate(profile, 50, 100, cache=cache)
+    profile.window_length = 4 * profile.alt_model.window_overlap()
+    calibrate(profile, 50, 100, cache=cache)
+    assert_equal(len(list(cache.directory.glob("*.npz"))), 3)
@@ -0,0 +1,45 @@
+from hmmer_reader import open_hmmer
+from numpy.testing import assert_equal
+
+from iseq.cache import tables_digest
+from iseq.database import ProfileDatabase
+from iseq.frame import create_profile as create_frame_profile
+from iseq.standard import create_profile
+
+
+def test_profile_database(database1, PF03373):
+    db = ProfileDatabase(database1, capacity=1)
+    assert_equal(len(db), 2)
+    assert_equal(db.names, ["Enolase_C", "Octapeptide"])
+    assert_equal(db.accessions, ["PF00113.22", "PF03373.14"])
+    assert "PF03373.14" in db
+    assert "Octapeptide" in db
+    assert "PF00000.1" not in db
+    assert (database1.parent / "database1.hmm.idx").exists()
+
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    octa = db["Octapeptide"]
+    assert db["PF03373.14"] is octa
+    assert_equal(tables_digest(octa.tables), tables_digest(profile.tables))
+
+    profiles = list(db)
+    assert_equal(len(profiles), 2)
+    assert db["Octapeptide"] is not octa
+
+    db = ProfileDatabase(database1, factory=create_frame_profile)
+    assert_equal(db.names, ["Enolase_C", "Octapeptide"])
+    assert "codon" in db["PF03373.14"].tables
+
+
+def test_profile_database_pickle(database1):
+    import pickle
+
+    db = ProfileDatabase(database1, capacity=2)
+    profile = db["PF03373.14"]
+    loaded = pickle.loads(pickle.dumps(db))
+    assert_equal(len(loaded._profiles), 0)
+    assert_equal(loaded.names, db.names)
+    digest = tables_digest(profile.tables)
+    assert_equal(tables_digest(loaded["PF03373.14"].tables), digest)
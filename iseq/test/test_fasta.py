@@ -0,0 +1,86 @@
+import os
+import shutil
+
+import pytest
+from numpy.testing import assert_equal
+
+from iseq.fasta import MappedFasta
+from iseq.pipeline import read_targets
+
+
+def test_fasta_mapped(tmp_path, cache_directory):
+    file = tmp_path / "targets.fasta"
+    with open(file, "w") as fp:
+        fp.write(">seq1 first\nACGT\nAC\n>seq2\n>seq3 third\r\nGGGG\r\nTT\r\n")
+
+    with MappedFasta(file) as fasta:
+        assert_equal(fasta.target("seq3").defline, "seq3 third")
+        assert_equal(fasta[0].tobytes(), b"ACGTAC")
+    assert not os.path.exists(f"{file}.seq")
+    assert_equal(len(list((cache_directory / "fasta").glob("*.seq"))), 1)
+
+    shutil.rmtree(cache_directory)
+    with MappedFasta(file, sidecar=True) as fasta:
+        assert_equal(len(fasta), 3)
+        deflines = [e.defline for e in fasta.entries]
+        assert_equal(deflines, ["seq1 first", "seq2", "seq3 third"])
+        assert isinstance(fasta[0], memoryview)
+        assert_equal(fasta[0].tobytes(), b"ACGTAC")
+        assert_equal(fasta["seq2"].tobytes(), b"")
+        assert_equal(fasta["seq3"].tobytes(), b"GGGGTT")
+        assert "seq3" in fasta
+        assert "third" not in fasta
+
+    mtime = os.stat(f"{file}.seq").st_mtime_ns
+    with MappedFasta(file, sidecar=True) as fasta:
+        assert_equal(fasta[2].tobytes(), b"GGGGTT")
+    assert_equal(os.stat(f"{file}.seq").st_mtime_ns, mtime)
+
+    with open(file, "a") as fp:
+        fp.write(">seq4\nCCC\n")
+    with MappedFasta(file, sidecar=True) as fasta:
+        assert_equal(fasta["seq4"].tobytes(), b"CCC")
+
+
+def test_fasta_mapped_read_only(tmp_path, cache_directory):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    file = directory / "targets.fasta"
+    with open(file, "w") as fp:
+        fp.write(">seq1\nACGT\n>seq2\nGG\n")
+
+    directory.chmod(0o555)
+    try:
+        if os.access(directory, os.W_OK):
+            pytest.skip("Permissions are not enforced for this user.")
+        with MappedFasta(file, sidecar=True) as fasta:
+            assert_equal(fasta["seq2"].tobytes(), b"GG")
+        with MappedFasta(file, sidecar=True) as fasta:
+            assert_equal(fasta["seq1"].tobytes(), b"ACGT")
+    finally:
+        directory.chmod(0o755)
+
+    assert_equal(sorted(p.name for p in directory.iterdir()), ["targets.fasta"])
+    companions = list((cache_directory / "fasta").glob("*.targets.fasta.seq*"))
+    assert_equal(len(companions), 2)
+
+
+def test_fasta_read_targets_mapped(amino1):
+    targets = list(read_targets(amino1))
+    mapped = list(read_targets(amino1, mapped=True))
+    assert_equal([t.defline for t in mapped], [t.defline for t in targets])
+    sequences = [t.sequence.tobytes().decode() for t in mapped]
+    assert_equal(sequences, [t.sequence for t in targets])
+
+
+def test_fasta_writer(tmp_path):
+    from iseq.fasta import FastaWriter
+
+    file = tmp_path / "output.fasta"
+    with open(file, "w") as fp:
+        with FastaWriter(fp, width=4, block_size=8) as fasta:
+            fasta.append("item1", b"ACGUACGUA")
+            fasta.append("item2", "NN")
+
+    with open(file, "r") as fp:
+        assert_equal(fp.read(), ">item1\nACGU\nACGU\nA\n>item2\nNN\n")
@@ -0,0 +1,50 @@
+import gzip
+import struct
+import zlib
+
+from numpy.testing import assert_equal
+
+from iseq._gff import GFFItem, open_gff
+
+
+def test_gff_compressed(tmp_path):
+    items = [
+        GFFItem(f"seq{i // 7}", "nmm", ".", i + 1, i + 10, 0.0, "+", ".", f"ID={i}")
+        for i in range(20000)
+    ]
+
+    for compression in ["gzip", "bgzf"]:
+        file = tmp_path / f"output.gff.{compression}"
+        with open_gff(file, compression, threads=2, block_size=1000) as gff:
+            for item in items:
+                gff.append(item)
+
+        with gzip.open(file, "rt") as fp:
+            lines = fp.read().splitlines()
+        assert_equal(lines[0], "##gff-version 3")
+        assert_equal(len(lines), len(items) + 1)
+        assert_equal(lines[1], "seq0\tnmm\t.\t1\t10\t0.0\t+\t.\tID=0")
+
+
+def test_gff_bgzf_index(tmp_path):
+    file = tmp_path / "output.gff.gz"
+    with open_gff(file, "bgzf", index=True) as gff:
+        for i in range(20000):
+            item = GFFItem(f"seq{i // 7}", "nmm", ".", i + 1, i + 9, 0.0, "+", ".", "")
+            gff.append(item)
+
+    with open(f"{file}.idx", "r") as fp:
+        rows = [row.split("\t") for row in fp.read().splitlines()]
+    assert_equal(len(rows), 2858)
+    assert_equal(rows[2000][:3], ["seq2000", "14001", "14015"])
+
+    offset = int(rows[2000][3])
+    with open(file, "rb") as fp:
+        fp.seek(offset >> 16)
+        block = zlib.decompressobj(31).decompress(fp.read(1 << 16))
+    line = block[offset & 0xFFFF :].split(b"\n")[0]
+    assert_equal(line, b"seq2000\tnmm\t.\t14001\t14009\t0.0\t+\t.\t")
+
+    with open(f"{file}.gzi", "rb") as fp:
+        nblocks = struct.unpack("<Q", fp.read(8))[0]
+    assert nblocks > 0
@@ -0,0 +1,199 @@
+from hmmer_reader import open_hmmer
+from nmm import Sequence
+from numpy.testing import assert_allclose, assert_equal
+
+from iseq.calibration import Calibration
+from iseq.database import ProfileDatabase
+from iseq.pipeline import (
+    Target,
+    create_candidates,
+    read_candidates,
+    read_targets,
+    scan,
+    scan_candidates,
+    scan_file,
+)
+from iseq.standard import create_profile
+
+
+def test_pipeline_scan(PF03373):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    targets = [
+        Target("seq1 first", "KKKPGKEDNNK"),
+        Target("seq2", "PPPPGKEDNNKDDDPGKEDNNKEEEE"),
+        Target("seq3", "PGKEDNNK"),
+    ]
+    profiles = [("PF03373.14", profile)]
+    hits = list(scan(targets, profiles, window=2))
+    assert_equal([hit.target.defline for hit in hits], ["seq1 first", "seq2", "seq3"])
+    assert_equal(hits[0].accession, "PF03373.14")
+
+    profile.prefilter_threshold = 0.0
+    hits = list(scan(iter(targets + [Target("seq4", "WWWWWWWW")]), profiles))
+    assert_equal(len(hits), 3)
+
+
+def test_pipeline_scan_evalue(PF03373, tmp_path):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    targets = [
+        Target("seq1", "KKKPGKEDNNK"),
+        Target("seq2", "PPPPGKEDNNKDDDPGKEDNNKEEEE"),
+    ]
+    profiles = [("PF03373.14", profile)]
+    calib = Calibration(5.0, 1.0)
+    calibrations = {"PF03373.14": calib}
+    hits = list(scan(targets, profiles, calibrations=calibrations, nsequences=10))
+    for hit in hits:
+        assert_allclose(hit.evalue, calib.evalue(hit.result.loglikelihood, 10))
+
+    best = max(hits, key=lambda hit: hit.result.loglikelihood)
+    scores = sorted(hit.result.loglikelihood for hit in hits)
+    max_evalue = calib.evalue((scores[0] + scores[1]) / 2, 10)
+    pruned = list(
+        scan(
+            targets,
+            profiles,
+            calibrations=calibrations,
+            nsequences=10,
+            max_evalue=max_evalue,
+        )
+    )
+    assert_equal([hit.target for hit in pruned], [best.target])
+    assert pruned[0].evalue <= max_evalue
+
+    output = tmp_path / "output.gff"
+    fasta = tmp_path / "targets.fasta"
+    with open(fasta, "w") as fp:
+        fp.write(">seq1\nKKKPGKEDNNK\n")
+    scan_file(fasta, profiles, output, calibrations=calibrations, nsequences=10)
+    with open(output, "r") as fp:
+        assert ";E-value=" in fp.read().splitlines()[1].split("\t")[8]
+
+
+def test_pipeline_scan_windows(PF03373):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    symbols = ("W" * 40 + "PGKEDNNK") * 5 + "W" * 40
+    targets = [Target("seq1", memoryview(symbols.encode()))]
+    profiles = [("PF03373.14", profile)]
+    whole = [i for i, h in zip(*_fragments(scan(targets, profiles))) if h]
+
+    profile.window_length = 4 * profile.alt_model.window_overlap()
+    hits = list(scan(targets, profiles))
+    assert len(hits) > 1
+    intervals, homologous = _fragments(hits)
+    assert all(homologous)
+    starts = [i.start for i in intervals]
+    assert_equal(starts, sorted(set(starts)))
+    assert_equal(starts, [i.start for i in whole])
+
+
+def _fragments(hits):
+    intervals = [i for hit in hits for i in hit.result.intervals]
+    homologous = [h for hit in hits for h in hit.result.homologous]
+    return intervals, homologous
+
+
+def test_pipeline_scan_file(PF03373, tmp_path):
+    with open_hmmer(PF03373) as reader:
+        profile = create_profile(reader.read_profile())
+
+    fasta = tmp_path / "targets.fasta"
+    with open(fasta, "w") as fp:
+        fp.write(">seq1 first\nKKKPGKEDNNK\n>seq2\nPPPPGKEDNNKDDDPGKEDNNKEEEE\n")
+
+    output = tmp_path / "output.gff"
+    nitems = scan_file(fasta, [("PF03373.14", profile)], output, window=1)
+
+    with open(output, "r") as fp:
+        lines = fp.read().splitlines()
+
+    assert_equal(lines[0], "##gff-version 3")
+    assert_equal(len(lines), nitems + 1)
+    assert nitems >= 3
+
+    cols = lines[1].split("\t")
+    assert_equal(cols[0], "seq1")
+    assert_equal(cols[1:3], ["nmm", "."])
+    assert_equal(cols[8], "ID=item1;Profile=PF03373.14")
+    assert int(cols[3]) <= int(cols[4])
+
+
+def test_pipeline_scan_candidates(database1, amino1, tblout):
+    candidates = read_candidates(tblout)
+    assert_equal(candidates, {"item2": ["PF03373.14"], "item3": ["PF03373.14"]})
+
+    db = ProfileDatabase(database1)
+    hits = list(scan_candidates(amino1, db, candidates, window=1))
+    assert_equal([hit.target.defline for hit in hits], ["item2", "item3"])
+    assert_equal([hit.accession for hit in hits], ["PF03373.14"] * 2)
+    assert hits[0].profile is db["PF03373.14"]
+
+    pairs = [("item1", "Enolase_C"), ("item1", "Octapeptide"), ("item3", "PF03373.14")]
+    candidates = create_candidates(pairs)
+    hits = list(scan_candidates(amino1, db, candidates))
+    queries = [(hit.target.defline, hit.accession) for hit in hits]
+    assert_equal(queries, pairs)
+
+    # Profiles are fetched once, as their targets are searched, so the database
+    # only needs room for a single one.
+    db = ProfileDatabase(database1, capacity=1)
+    hits = list(scan_candidates(amino1, db, candidates, window=1, workers=2))
+    queries = [(hit.target.defline, hit.accession) for hit in hits]
+    assert_equal(queries, pairs)
+
+    # Hits are grouped by query.
+    pairs = [("item3", "PF03373.14"), ("item1", "Enolase_C"), ("item2", "PF03373.14")]
+    hits = list(scan_candidates(amino1, db, create_candidates(pairs)))
+    queries = [(hit.target.defline, hit.accession) for hit in hits]
+    assert_equal(queries, [pairs[0], pairs[2], pairs[1]])
+
+
+def test_pipeline_scan_file_decode(PF03373, GALNBKIG_cut, tmp_path):
+    from iseq.frame import create_profile as create_frame_profile
+
+    with open_hmmer(PF03373) as reader:
+        profile = create_frame_profile(reader.read_profile(), epsilon=0.01)
+
+    output = tmp_path / "output.gff"
+    amino = tmp_path / "output.amino.fasta"
+    codon = tmp_path / "output.codon.fasta"
+    profiles = [("PF03373.14", profile)]
+    scan_file(GALNBKIG_cut["fasta"], profiles, output, amino=amino, codon=codon)
+
+    for file, expected in [
+        (output, GALNBKIG_cut["gff"]),
+        (amino, GALNBKIG_cut["amino.fasta"]),
+        (codon, GALNBKIG_cut["codon.fasta"]),
+    ]:
+        with open(file, "r") as fp, open(expected, "r") as ref:
+            assert_equal(fp.read().splitlines(), ref.read().splitlines())
+
+
+def test_pipeline_scan_both_strands(PF03373, GALNBKIG_cut):
+    from iseq.frame import create_profile as create_frame_profile
+
+    with open_hmmer(PF03373) as reader:
+        profile = create_frame_profile(reader.read_profile(), epsilon=0.01)
+
+    profiles = [("PF03373.14", profile)]
+    targets = list(read_targets(GALNBKIG_cut["fasta"]))
+    forward = list(scan(targets, profiles))
+    both = list(scan(targets, profiles, both_strands=True))
+
+    assert_equal([hit.result.strand for hit in both], ["+", "-"] * len(forward))
+    for hit, plus, minus in zip(forward, both[::2], both[1::2]):
+        assert_equal(plus.target, hit.target)
+        assert_equal(minus.target, hit.target)
+        assert_allclose(plus.result.loglikelihood, hit.result.loglikelihood)
+
+        symbols = hit.target.sequence.encode().replace(b"T", b"U")
+        strands = profile.search_strands(Sequence(symbols, profile.alphabet))
+        assert_allclose(minus.result.loglikelihood, strands[1].loglikelihood)
+        intervals = [(i.start, i.stop) for i in minus.result.intervals]
+        assert_equal(intervals, [(i.start, i.stop) for i in strands[1].intervals])
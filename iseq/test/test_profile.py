@@ -0,0 +1,27 @@
+from math import log
+
+from numpy.testing import assert_allclose, assert_equal
+
+from iseq.profile import _length_bucket, _target_length_lprobs
+
+
+def test_profile_length_bucket():
+    for error in [0.0, 0.001, 0.01, 0.1]:
+        for length in range(1, 5000):
+            bucket = _length_bucket(length, error)
+            assert abs(log(bucket) - log(length)) <= error
+
+    assert_equal(_length_bucket(1234, 0.0), 1234)
+    buckets = set(_length_bucket(length, 0.05) for length in range(100, 200))
+    assert len(buckets) < 20
+
+
+def test_profile_target_length_lprobs():
+    error = 0.01
+    for multiple_hits in [True, False]:
+        for length in [10, 150, 151, 300, 10000]:
+            exact = _target_length_lprobs(length, multiple_hits)
+            approx = _target_length_lprobs(_length_bucket(length, error), multiple_hits)
+            assert_allclose(approx.lp, exact.lp, atol=error)
+            assert_allclose(approx.l1p, exact.l1p, atol=error)
+            assert_allclose(approx.lr, exact.lr, atol=error)